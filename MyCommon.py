@@ -3,12 +3,15 @@ import glob
 import imghdr
 import json
 import os
+import random
 import re
 import shutil
 import threading
 import time
+import zlib
 
 import aiofiles
+import aiohttp
 from PySide6.QtCore import QObject
 from cf_clearance import sync_cf_retry, sync_stealth
 from datetime import date
@@ -19,8 +22,8 @@ import cv2
 import numpy as np
 import requests
 from playwright.sync_api import sync_playwright
-from requests import Timeout
 
+import MyHttp
 from TextOut import TextOut
 from ChromeCookies import parse_cookies
 
@@ -96,6 +99,216 @@ async def async_save_json(file_path: str, data) -> None:
         print(e)
 
 
+_path_locks: dict[str, threading.Lock] = {}
+_path_locks_lock = threading.Lock()
+# trailer of files written by older versions, only read
+CHECKSUM_TAG = b"\n#crc32:"
+CHECKSUM_SUFFIX = ".crc"
+BACKUP_SUFFIX = ".bak"
+# files loaded from their backup, the next write must not rotate the bad file over it
+_restored: set[str] = set()
+
+
+def path_lock(path: str) -> threading.Lock:
+    key = os.path.normcase(os.path.abspath(path))
+    with _path_locks_lock:
+        lock = _path_locks.get(key)
+        if lock is None:
+            lock = threading.Lock()
+            _path_locks[key] = lock
+        return lock
+
+
+def _fsync_dir(folder: str) -> None:
+    # a directory cannot be opened on windows, NTFS journals the rename itself
+    if os.name == "nt":
+        return
+    fd = os.open(folder or ".", os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _write_synced(path: str, data: bytes) -> None:
+    with open(path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def mark_restored(path: str) -> None:
+    """Tell atomic_write that ``path`` was loaded from its backup."""
+    _restored.add(os.path.normcase(os.path.abspath(path)))
+
+
+def atomic_write(path: str, data: bytes, checksum: bool = False, backup: bool = False) -> bool:
+    """Write a file so a crash leaves either the old or the new content.
+
+    :param path: 保存する Path
+    :param data: 保存するデータ
+    :param checksum: keep a crc32 in path + ".crc", checked by read_checked
+    :param backup: keep the previous file as path + ".bak", unless it was the one that failed to load
+    """
+    tmp_path = path + "_tmp"
+    crc_path = path + CHECKSUM_SUFFIX
+    key = os.path.normcase(os.path.abspath(path))
+    with path_lock(path):
+        try:
+            _write_synced(tmp_path, data)
+            if checksum:
+                _write_synced(crc_path + "_tmp", f"{zlib.crc32(data):08x}\n".encode("ascii"))
+            if backup and os.path.exists(path) and key not in _restored:
+                os.replace(path, path + BACKUP_SUFFIX)
+                if os.path.exists(crc_path):
+                    os.replace(crc_path, path + BACKUP_SUFFIX + CHECKSUM_SUFFIX)
+                elif os.path.exists(path + BACKUP_SUFFIX + CHECKSUM_SUFFIX):
+                    os.remove(path + BACKUP_SUFFIX + CHECKSUM_SUFFIX)
+            os.replace(tmp_path, path)
+            if checksum:
+                os.replace(crc_path + "_tmp", crc_path)
+            elif os.path.exists(crc_path):
+                os.remove(crc_path)
+            _fsync_dir(os.path.dirname(path))
+            _restored.discard(key)
+            return True
+        except Exception as e:
+            print(e)
+    return False
+
+
+def read_checked(path: str) -> Optional[bytes]:
+    """Read a file written by atomic_write, None when it is missing or the checksum does not match.
+
+    Files without a checksum are returned as they are.
+    """
+    with path_lock(path):
+        try:
+            with open(path, "rb") as f:
+                raw = f.read()
+            crc = None
+            if os.path.exists(path + CHECKSUM_SUFFIX):
+                with open(path + CHECKSUM_SUFFIX, "rb") as f:
+                    crc = f.read().strip()
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(e)
+            return None
+    if crc is not None:
+        if crc != f"{zlib.crc32(raw):08x}".encode("ascii"):
+            print("Checksum Error", path)
+            return None
+        return raw
+    i = raw.rfind(CHECKSUM_TAG)
+    if i < 0:
+        return raw
+    body = raw[:i]
+    if raw[i + len(CHECKSUM_TAG):].strip() != f"{zlib.crc32(body):08x}".encode("ascii"):
+        print("Checksum Error", path)
+        return None
+    return body
+
+
+class DiskLru:
+    """Byte budget for a folder of cache files named ``<key><suffix>``.
+
+    The index of sizes and last use is read from the folder on first use.
+    ``add`` removes the least recently used files once the folder is over
+    ``max_bytes``, down to 90% of it.
+    """
+
+    def __init__(self, folder: str, suffix: str, max_bytes: int):
+        self.folder = folder
+        self.suffix = suffix
+        self.max_bytes = max_bytes
+        self.index: Optional[dict[str, list]] = None
+        self.total = 0
+        self.evicted = 0
+        self.lock = threading.Lock()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.folder, key + self.suffix)
+
+    def set_folder(self, folder: str) -> None:
+        with self.lock:
+            if folder != self.folder:
+                self.folder = folder
+                self.index = None
+                self.total = 0
+
+    def _ensure(self) -> None:
+        if self.index is not None:
+            return
+        index = {}
+        total = 0
+        os.makedirs(self.folder, exist_ok=True)
+        with os.scandir(self.folder) as it:
+            for e in it:
+                if e.name.endswith(self.suffix):
+                    st = e.stat()
+                    index[e.name[:-len(self.suffix)]] = [st.st_size, st.st_mtime]
+                    total += st.st_size
+        self.index = index
+        self.total = total
+
+    def __contains__(self, key: str) -> bool:
+        with self.lock:
+            self._ensure()
+            return key in self.index
+
+    def __len__(self) -> int:
+        with self.lock:
+            return len(self.index or ())
+
+    def touch(self, key: str) -> None:
+        now = time.time()
+        with self.lock:
+            entry = self.index.get(key) if self.index is not None else None
+            if entry:
+                entry[1] = now
+        try:
+            os.utime(self.path(key), (now, now))
+        except OSError as e:
+            print(e)
+
+    def add(self, key: str, size: int) -> None:
+        victims = []
+        with self.lock:
+            self._ensure()
+            old = self.index.get(key)
+            if old:
+                self.total -= old[0]
+            self.index[key] = [size, time.time()]
+            self.total += size
+            if self.total > self.max_bytes:
+                target = self.max_bytes * 0.9
+                for k, (k_size, _) in sorted(self.index.items(), key=lambda i: i[1][1]):
+                    if self.total <= target:
+                        break
+                    del self.index[k]
+                    self.total -= k_size
+                    self.evicted += 1
+                    victims.append(k)
+        for k in victims:
+            try:
+                os.remove(self.path(k))
+            except OSError as e:
+                print(e)
+
+    def drop(self, key: str) -> None:
+        with self.lock:
+            entry = self.index.pop(key, None) if self.index is not None else None
+            if entry:
+                self.total -= entry[0]
+        try:
+            os.remove(self.path(key))
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(e)
+
+
 def clean_dir(path: str) -> None:
     """Remove all Files in a Folder
 
@@ -193,6 +406,10 @@ def copy_file(src, des):
         print('Error: %s' % e.strerror)
 
 
+def is_image(path: AnyStr) -> bool:
+    return imghdr.what(path) is not None
+
+
 def download(url: AnyStr, folder, file: Optional[AnyStr] = None) -> Tuple[AnyStr, AnyStr]:
     path = file
 
@@ -200,26 +417,86 @@ def download(url: AnyStr, folder, file: Optional[AnyStr] = None) -> Tuple[AnyStr
         filename = url.split("/")[-1]
         path = f"{folder}/{filename}"
 
-    r = requests.get(url, stream=True)
-    if r.status_code == 200:
-        # print(f"save to {path}")
-        with open(path, 'wb') as f:
-            r.raw.decode_content = True
-            shutil.copyfileobj(r.raw, f)
-            f.close()
+    try:
+        status = MyHttp.download(url, path, probe=is_image)
+    except MyHttp.InvalidDownload as e:
+        TextOut.out(f"Not an image {e} << {url}")
+        return "", ""
+    except Exception as e:
+        print(e)
+        return "", ""
+    if status in (200, 206):
         return url, path
-    else:
-        print(r.status_code)
-        # r.raise_for_status()
+    print(status)
     return "", ""
 
 
+class DownloadResult(tuple):
+    """``(url, path)`` like before, ``url`` is "" on failure.
+
+    ``status`` is the http status (0 when there was no response) and ``error``
+    says why the download failed.
+    """
+
+    def __new__(cls, url: AnyStr, path: AnyStr, status: int = 0, error: str = ""):
+        r = super().__new__(cls, (url, path))
+        r.status = status
+        r.error = error
+        return r
+
+    @property
+    def ok(self) -> bool:
+        return bool(self[0])
+
+    def transient(self) -> bool:
+        if self.status:
+            return self.status in (408, 425, 429) or self.status >= 500
+        return self.error in ("timeout", "connection", "empty", "incomplete")
+
+
+class RetryPolicy:
+    """Full jitter exponential backoff for transient failures only.
+
+    ``budget`` is shared by every download of a job, so a gallery of dead
+    links gives up after a bounded number of retries in total.
+    """
+    BASE = 0.5
+    CAP = 30.0
+    BUDGET_PER_FILE = 2
+    MIN_BUDGET = 10
+
+    def __init__(self, retry: int = 5, budget: int = -1, base: float = BASE, cap: float = CAP):
+        self.retry = int(retry)
+        self.budget = budget
+        self.base = base
+        self.cap = cap
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def for_job(retry: int, count: int) -> "RetryPolicy":
+        return RetryPolicy(retry, max(RetryPolicy.MIN_BUDGET, count * RetryPolicy.BUDGET_PER_FILE))
+
+    def allow(self, result: DownloadResult, attempt: int) -> bool:
+        if attempt >= self.retry or not result.transient():
+            return False
+        with self.lock:
+            if self.budget == 0:
+                return False
+            if self.budget > 0:
+                self.budget -= 1
+        return True
+
+    def delay(self, attempt: int) -> float:
+        return random.uniform(0, min(self.cap, self.base * 2 ** attempt))
+
+
 async def download_retry(params: list):
     return await download_with_retry(*params)
 
 
 async def download_with_retry(loop, url: AnyStr, folder, file: Optional[AnyStr] = None,
-                              retry: int = 5, base_url: str = None) -> Tuple[AnyStr, AnyStr]:
+                              retry: int = 5, base_url: str = None,
+                              policy: Optional[RetryPolicy] = None) -> DownloadResult:
     path = file
 
     if not file:
@@ -231,20 +508,24 @@ async def download_with_retry(loop, url: AnyStr, folder, file: Optional[AnyStr]
         if imghdr.what(path) is not None:  # and os.path.getsize(path) > 0:
             # TextOut.out(f"File already exist {path}")
             TextOut.out(f"Skip {path}")
-            return url, file
+            return DownloadResult(url, path)
 
-    count = 0
-    r_url = ""
-    r_path = ""
+    if policy is None:
+        policy = RetryPolicy(retry)
 
-    while r_url == "" and count < retry:
-        print(count, retry)
-        r_url, r_path = await download_file(url, path, base_url, loop)
-        count += 1
-        if r_url == "":
-            TextOut.out(f"Retry {path} << {url}")
+    attempt = 0
+    while True:
+        result = await download_file(url, path, base_url, loop)
+        attempt += 1
+        if result.ok or not policy.allow(result, attempt):
+            break
+        wait = policy.delay(attempt)
+        TextOut.out(f"Retry {path} << {url} ({result.error}, {wait:.1f}s)")
+        await asyncio.sleep(wait)
 
-    return r_url, r_path
+    if not result.ok:
+        TextOut.out(f"Give up {path} << {url} ({result.error})")
+    return result
 
 
 def bypass_test(url: str):
@@ -295,7 +576,7 @@ def get_agent() -> str:
     return user_agent
 
 
-async def download_file(url: AnyStr, path: AnyStr, base_url=None, loop=None) -> Tuple[AnyStr, AnyStr]:
+async def download_file(url: AnyStr, path: AnyStr, base_url=None, loop=None) -> DownloadResult:
     if not base_url:
         base_url = "{0.scheme}://{0.netloc}/".format(urlsplit(url))
 
@@ -307,37 +588,36 @@ async def download_file(url: AnyStr, path: AnyStr, base_url=None, loop=None) ->
     return await __download(url, headers, get_cookie(base_url), path, loop)
 
 
-async def __download(url, header, cookie, path, loop) -> tuple[str, str]:
-    if not loop:
-        loop = asyncio.get_event_loop()
-
+async def __download(url, header, cookie, path, loop) -> DownloadResult:
+    if cookie:
+        header = dict(header, Cookie=MyHttp.cookie_header(cookie))
     try:
-        r = await loop.run_in_executor(None, lambda: requests.get(url, stream=True, timeout=(6.0, 12.0),
-                                                                  headers=header, cookies=cookie, verify=False))
-    except Timeout:
-        return "", path
-
-    if r.status_code == 200:
-        # print(r.headers["content-type"])
-        try:
-            with open(path, 'wb') as f:
-                r.raw.decode_content = True
-                shutil.copyfileobj(r.raw, f)
-                f.close()
-            # if imghdr.what(path) is not None:
-            size = os.path.getsize(path)
-            if size > 0:
-                TextOut.out(f"{size} Saved {path} << {url}")
-            else:
-                TextOut.out(f"Failed {path} << {url}")
-                return "", path
-        except Exception as e:
-            print(e)
-            return "", path
-        return url, path
+        status = await MyHttp.async_download(url, path, headers=header, probe=is_image)
+    except asyncio.TimeoutError:
+        return DownloadResult("", path, error="timeout")
+    except MyHttp.IncompleteDownload as e:
+        print(e)
+        return DownloadResult("", path, error="incomplete")
+    except MyHttp.InvalidDownload as e:
+        TextOut.out(f"Not an image {e} << {url}")
+        return DownloadResult("", path, error="invalid")
+    except aiohttp.ClientError as e:
+        print(e)
+        return DownloadResult("", path, error="connection")
+    except Exception as e:
+        print(e)
+        return DownloadResult("", path, error="io")
+
+    if status not in (200, 206):
+        TextOut.out(f"Save Image Error {status} << {url}")
+        return DownloadResult("", path, status, f"http {status}")
+    size = os.path.getsize(path)
+    if size > 0:
+        TextOut.out(f"{size} Saved {path} << {url}")
     else:
-        TextOut.out(f"Save Image Error {r.status_code} << {url}")
-        return "", path
+        TextOut.out(f"Failed {path} << {url}")
+        return DownloadResult("", path, status, "empty")
+    return DownloadResult(url, path, status)
 
 
 """
@@ -384,4 +664,4 @@ def str_to_date(date_string: str):
 
 
 def get_html(url: AnyStr) -> str:
-    return requests.get(url).text
+    return MyHttp.get(url).text
@@ -0,0 +1,411 @@
+"""Shared http client, one keep-alive requests.Session per host.
+
+The session carries the User-Agent, a Referer of the host itself and the cookies
+get_cookie() knows for that site, so every page or image of a host reuses the
+same pooled connections instead of a new TCP + TLS handshake per call.
+Every request waits for its host's MyThrottle slot first.
+
+Coroutines use an aiohttp ClientSession per event loop instead, with the same
+headers and cookies added per host, so async callers never park a thread on a
+socket. ``async_close`` has to run on the loop before it is closed.
+"""
+import asyncio
+import contextlib
+import json
+import os
+import re
+import threading
+from concurrent.futures import Future
+from typing import AnyStr, Callable, Optional
+from urllib.parse import urlsplit
+
+import aiofiles
+import aiohttp
+import requests
+from requests import Response
+from requests.adapters import HTTPAdapter
+
+import MyThrottle
+
+POOL_SIZE = 16
+TIMEOUT = (6.0, 12.0)
+
+ASYNC_LIMIT = 64
+ASYNC_TIMEOUT = aiohttp.ClientTimeout(total=None, connect=TIMEOUT[0], sock_read=TIMEOUT[1])
+CHUNK_SIZE = 64 * 1024
+PART_SUFFIX = ".part"
+META_SUFFIX = ".meta"
+
+_sessions: dict[str, requests.Session] = {}
+_clients: dict[asyncio.AbstractEventLoop, aiohttp.ClientSession] = {}
+_headers: dict[str, dict] = {}
+_lock = threading.Lock()
+
+
+class _Abandoned(Exception):
+    """The leader was cancelled, a follower runs the call instead."""
+
+
+class SingleFlight:
+    """Run one call per key at a time and hand its result to everyone who asked meanwhile.
+
+    The shared result lives in a concurrent Future, so followers can be plain
+    threads or coroutines on any event loop. A blocking caller on the thread
+    of a coroutine leader runs the call itself, it could never see it finish.
+    A cancelled leader only cancels itself, its followers run the call again.
+    """
+
+    def __init__(self):
+        self.calls: dict[str, tuple[Future, int]] = {}
+        self.lock = threading.Lock()
+
+    def _join(self, key: str, blocking: bool) -> tuple[Future, bool]:
+        """The future to wait on and whether this caller has to run the call."""
+        with self.lock:
+            call = self.calls.get(key)
+            if call is None:
+                f = Future()
+                self.calls[key] = (f, threading.get_ident())
+                return f, True
+            if blocking and call[1] == threading.get_ident():
+                return Future(), True
+            return call[0], False
+
+    def _done(self, key: str, f: Future) -> None:
+        with self.lock:
+            call = self.calls.get(key)
+            if call is not None and call[0] is f:
+                del self.calls[key]
+
+    def do(self, key: str, func: Callable, *args):
+        while True:
+            f, run = self._join(key, True)
+            if run:
+                break
+            try:
+                return f.result()
+            except _Abandoned:
+                continue
+        # the key is released before the result is set, a woken follower never sees the old call
+        try:
+            result = func(*args)
+        except BaseException as e:
+            self._done(key, f)
+            f.set_exception(e)
+            raise
+        self._done(key, f)
+        f.set_result(result)
+        return result
+
+    async def async_do(self, key: str, func: Callable, *args):
+        while True:
+            f, run = self._join(key, False)
+            if run:
+                break
+            try:
+                # shielded, a cancelled follower must not cancel the shared future
+                return await asyncio.shield(asyncio.wrap_future(f))
+            except _Abandoned:
+                continue
+        try:
+            result = await func(*args)
+        except asyncio.CancelledError:
+            self._done(key, f)
+            f.set_exception(_Abandoned())
+            raise
+        except BaseException as e:
+            self._done(key, f)
+            f.set_exception(e)
+            raise
+        self._done(key, f)
+        f.set_result(result)
+        return result
+
+
+flight = SingleFlight()
+
+
+def base_url(url: AnyStr) -> str:
+    return "{0.scheme}://{0.netloc}/".format(urlsplit(url))
+
+
+def session(url: AnyStr) -> requests.Session:
+    host = urlsplit(url).netloc
+    with _lock:
+        s = _sessions.get(host)
+        if s is None:
+            s = _new_session(base_url(url))
+            _sessions[host] = s
+        return s
+
+
+def _new_session(base: str) -> requests.Session:
+    # MyCommon imports this module for its downloads
+    from MyCommon import get_agent, get_cookie
+
+    s = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE)
+    s.mount("http://", adapter)
+    s.mount("https://", adapter)
+    s.headers.update({"User-Agent": get_agent(), "Referer": base})
+    cookie = get_cookie(base)
+    if cookie:
+        s.cookies.update(cookie)
+    return s
+
+
+def request(method: str, url: AnyStr, headers: Optional[dict] = None, **kwargs) -> Response:
+    kwargs.setdefault("timeout", TIMEOUT)
+    throttle = MyThrottle.host(url)
+    throttle.acquire()
+    status = 0
+    retry_after = None
+    try:
+        r = session(url).request(method, url, headers=headers, **kwargs)
+        status = r.status_code
+        retry_after = r.headers.get("Retry-After")
+        return r
+    finally:
+        throttle.release(status, retry_after)
+
+
+def get(url: AnyStr, headers: Optional[dict] = None, **kwargs) -> Response:
+    return request("GET", url, headers=headers, **kwargs)
+
+
+def flight_key(url: AnyStr, headers: Optional[dict] = None) -> str:
+    if not headers:
+        return url
+    return url + "\n" + repr(sorted(headers.items()))
+
+
+def get_content(url: AnyStr, headers: Optional[dict] = None, **kwargs) -> bytes:
+    """Body of a successful GET, concurrent calls for the same url share one request."""
+    return flight.do(flight_key(url, headers), _get_content, url, headers, kwargs)
+
+
+def _get_content(url: AnyStr, headers: Optional[dict], kwargs: dict) -> bytes:
+    r = get(url, headers=headers, **kwargs)
+    r.raise_for_status()
+    return r.content
+
+
+def post(url: AnyStr, data=None, headers: Optional[dict] = None, **kwargs) -> Response:
+    return request("POST", url, headers=headers, data=data, **kwargs)
+
+
+def close() -> None:
+    with _lock:
+        for s in _sessions.values():
+            s.close()
+        _sessions.clear()
+
+
+# downloads
+
+class IncompleteDownload(Exception):
+    """Body ended before Content-Length, the .part file is kept for a ranged retry."""
+
+
+class InvalidDownload(Exception):
+    """The probe rejected the downloaded file, the .part file is removed."""
+
+
+def _validator(headers) -> str:
+    """Strong ETag, else Last-Modified, what If-Range accepts."""
+    etag = headers.get("ETag", "")
+    if etag and not etag.startswith("W/"):
+        return etag
+    return headers.get("Last-Modified", "")
+
+
+def _read_meta(part: AnyStr) -> dict:
+    try:
+        with open(part + META_SUFFIX, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _drop_part(part: AnyStr) -> None:
+    for p in (part, part + META_SUFFIX):
+        if os.path.exists(p):
+            os.remove(p)
+
+
+def _resume(url: AnyStr, path: AnyStr, headers: Optional[dict]) -> tuple[str, int, dict]:
+    part = path + PART_SUFFIX
+    offset = os.path.getsize(part) if os.path.exists(part) else 0
+    # identity so Content-Length is the size of what ends up on disk
+    h = dict(headers or (), **{"Accept-Encoding": "identity"})
+    if offset:
+        meta = _read_meta(part)
+        if meta.get("url") == url and meta.get("validator"):
+            h["Range"] = f"bytes={offset}-"
+            h["If-Range"] = meta["validator"]
+        else:
+            # no way to tell the part belongs to this file
+            _drop_part(part)
+            offset = 0
+    return part, offset, h
+
+
+def _start(url: AnyStr, part: AnyStr, offset: int, status: int, headers) -> tuple[int, int]:
+    """Offset to write the body at and the expected final size (-1 if unknown).
+
+    A 200 (the If-Range validator did not match) starts the part again.
+    """
+    start = 0
+    validator = _validator(headers)
+    if status == 206:
+        m = re.match(r"bytes (\d+)-", headers.get("Content-Range", ""))
+        if not m or int(m.group(1)) != offset:
+            _drop_part(part)
+            raise IncompleteDownload(f"unexpected range {headers.get('Content-Range')} for {offset}")
+        if validator != _read_meta(part).get("validator"):
+            _drop_part(part)
+            raise IncompleteDownload(f"{url} changed since the part was written")
+        start = offset
+    else:
+        _drop_part(part)
+        if validator:
+            with open(part + META_SUFFIX, "w", encoding="utf-8") as f:
+                json.dump({"url": url, "validator": validator}, f)
+    length = headers.get("Content-Length", "")
+    if length.isdigit() and headers.get("Content-Encoding", "identity") == "identity":
+        return start, start + int(length)
+    return start, -1
+
+
+def _finish(part: AnyStr, path: AnyStr, expected: int, probe: Optional[Callable[[str], bool]]) -> None:
+    size = os.path.getsize(part)
+    if 0 <= expected != size:
+        raise IncompleteDownload(f"{size} of {expected} bytes")
+    if probe and not probe(part):
+        _drop_part(part)
+        raise InvalidDownload(path)
+    os.replace(part, path)
+    if os.path.exists(part + META_SUFFIX):
+        os.remove(part + META_SUFFIX)
+
+
+def download(url: AnyStr, path: AnyStr, headers: Optional[dict] = None,
+             probe: Optional[Callable[[str], bool]] = None, **kwargs) -> int:
+    """Stream ``url`` into ``path`` through ``path.part``, resuming a previous part with Range.
+
+    The part is only resumed for the same url with an ETag or Last-Modified
+    to send as If-Range, kept next to it in ``path.part.meta``.
+
+    Returns the http status, ``path`` only exists once the whole body is there.
+    """
+    for _ in range(2):
+        part, offset, h = _resume(url, path, headers)
+        with get(url, headers=h, stream=True, **kwargs) as r:
+            if r.status_code == 416 and offset:
+                # the part is stale or already complete, start again
+                _drop_part(part)
+                continue
+            if r.status_code not in (200, 206):
+                return r.status_code
+            start, expected = _start(url, part, offset, r.status_code, r.headers)
+            with open(part, "ab" if start else "wb") as f:
+                for chunk in r.iter_content(CHUNK_SIZE):
+                    f.write(chunk)
+            _finish(part, path, expected, probe)
+            return r.status_code
+    return 416
+
+
+# asyncio
+
+def host_headers(url: AnyStr) -> dict:
+    host = urlsplit(url).netloc
+    with _lock:
+        h = _headers.get(host)
+        if h is None:
+            from MyCommon import get_agent, get_cookie
+
+            base = base_url(url)
+            h = {"User-Agent": get_agent(), "Referer": base}
+            cookie = get_cookie(base)
+            if cookie:
+                h["Cookie"] = cookie_header(cookie)
+            _headers[host] = h
+        return h
+
+
+def cookie_header(cookie) -> str:
+    return "; ".join(f"{c.name}={c.value}" for c in cookie)
+
+
+def client() -> aiohttp.ClientSession:
+    loop = asyncio.get_running_loop()
+    with _lock:
+        c = _clients.get(loop)
+        if c is None or c.closed:
+            # the connector limit is what keeps thousands of queued downloads cheap
+            connector = aiohttp.TCPConnector(limit=ASYNC_LIMIT, limit_per_host=POOL_SIZE, ssl=False)
+            c = aiohttp.ClientSession(connector=connector, timeout=ASYNC_TIMEOUT)
+            _clients[loop] = c
+        return c
+
+
+@contextlib.asynccontextmanager
+async def async_request(method: str, url: AnyStr, headers: Optional[dict] = None, **kwargs):
+    """Use as ``async with MyHttp.async_request("GET", url) as r:``.
+
+    The host's throttle slot is held until the body has been read.
+    """
+    h = dict(host_headers(url))
+    if headers:
+        h.update(headers)
+    throttle = MyThrottle.host(url)
+    await throttle.async_acquire()
+    status = 0
+    retry_after = None
+    try:
+        async with client().request(method, url, headers=h, **kwargs) as r:
+            status = r.status
+            retry_after = r.headers.get("Retry-After")
+            yield r
+    finally:
+        throttle.release(status, retry_after)
+
+
+async def async_get(url: AnyStr, headers: Optional[dict] = None, **kwargs) -> bytes:
+    """Body of a successful GET, concurrent calls for the same url share one request."""
+    return await flight.async_do(flight_key(url, headers), _async_get, url, headers, kwargs)
+
+
+async def _async_get(url: AnyStr, headers: Optional[dict], kwargs: dict) -> bytes:
+    async with async_request("GET", url, headers=headers, **kwargs) as r:
+        r.raise_for_status()
+        return await r.read()
+
+
+async def async_download(url: AnyStr, path: AnyStr, headers: Optional[dict] = None,
+                         probe: Optional[Callable[[str], bool]] = None, **kwargs) -> int:
+    """Async version of ``download``, the body is streamed chunk by chunk."""
+    for _ in range(2):
+        part, offset, h = _resume(url, path, headers)
+        async with async_request("GET", url, headers=h, **kwargs) as r:
+            if r.status == 416 and offset:
+                _drop_part(part)
+                continue
+            if r.status not in (200, 206):
+                return r.status
+            start, expected = _start(url, part, offset, r.status, r.headers)
+            async with aiofiles.open(part, "ab" if start else "wb") as f:
+                async for chunk in r.content.iter_chunked(CHUNK_SIZE):
+                    await f.write(chunk)
+            _finish(part, path, expected, probe)
+            return r.status
+    return 416
+
+
+async def async_close() -> None:
+    loop = asyncio.get_running_loop()
+    with _lock:
+        c = _clients.pop(loop, None)
+    if c is not None:
+        await c.close()
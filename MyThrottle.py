@@ -0,0 +1,140 @@
+"""Per-host request governor used by MyHttp.
+
+Every host gets a token bucket (``rate`` requests per second, ``burst`` at once)
+and a cap on requests in flight. Both back off multiplicatively when the host
+answers 429/503 (honouring Retry-After) and grow back additively while it
+answers normally, so each site runs at about the rate it tolerates.
+
+It is shared by the requests sessions and the per-loop aiohttp clients, so the
+state is guarded by a threading lock and coroutines wait with asyncio.sleep.
+"""
+import asyncio
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import AnyStr, Optional
+from urllib.parse import urlsplit
+
+RATE = 8.0
+BURST = 8
+IN_FLIGHT = 8
+
+MIN_RATE = 0.2
+BACKOFF = (429, 503)
+DECREASE = 0.5
+# added to the rate per successful request, so recovery takes rate / INCREASE requests
+INCREASE = 0.1
+POLL = 0.05
+MAX_PAUSE = 120.0
+
+_hosts: dict[str, "HostThrottle"] = {}
+_lock = threading.Lock()
+
+
+class HostThrottle:
+    def __init__(self, host: str, rate: float = RATE, burst: int = BURST, in_flight: int = IN_FLIGHT):
+        self.host = host
+        self.max_rate = rate
+        self.burst = burst
+        self.max_in_flight = in_flight
+        self.rate = rate
+        self.limit = float(in_flight)
+        self.tokens = float(burst)
+        self.stamp = time.monotonic()
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def configure(self, rate: float, burst: int, in_flight: int) -> None:
+        with self.lock:
+            self.max_rate = rate
+            self.burst = burst
+            self.max_in_flight = in_flight
+            self.rate = min(self.rate, rate)
+            self.limit = min(self.limit, float(in_flight))
+            self.tokens = min(self.tokens, float(burst))
+
+    def _reserve(self) -> float:
+        """Take a slot and a token and return 0, or return how long to wait before trying again."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+            self.stamp = now
+            if now < self.paused_until:
+                return self.paused_until - now
+            if self.in_flight >= int(self.limit):
+                return POLL
+            if self.tokens < 1:
+                return (1 - self.tokens) / self.rate
+            self.tokens -= 1
+            self.in_flight += 1
+            return 0
+
+    def acquire(self) -> None:
+        while True:
+            wait = self._reserve()
+            if not wait:
+                return
+            time.sleep(wait)
+
+    async def async_acquire(self) -> None:
+        while True:
+            wait = self._reserve()
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+
+    def release(self, status: int = 0, retry_after: Optional[str] = None) -> None:
+        with self.lock:
+            self.in_flight -= 1
+            if status in BACKOFF:
+                self.rate = max(MIN_RATE, self.rate * DECREASE)
+                self.limit = max(1.0, self.limit * DECREASE)
+                self.tokens = min(self.tokens, 0.0)
+                pause = HostThrottle.parse_retry_after(retry_after)
+                if pause:
+                    self.paused_until = max(self.paused_until, time.monotonic() + min(pause, MAX_PAUSE))
+                print("throttle", self.host, status, f"{self.rate:.2f}/s", int(self.limit))
+            elif 200 <= status < 400:
+                self.rate = min(self.max_rate, self.rate + INCREASE)
+                self.limit = min(float(self.max_in_flight), self.limit + INCREASE)
+
+    @staticmethod
+    def parse_retry_after(value: Optional[str]) -> float:
+        if not value:
+            return 0.0
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except Exception as e:
+            print(e)
+        return 0.0
+
+
+def host(url: AnyStr) -> HostThrottle:
+    netloc = urlsplit(url).netloc
+    with _lock:
+        t = _hosts.get(netloc)
+        if t is None:
+            t = HostThrottle(netloc, RATE, BURST, IN_FLIGHT)
+            _hosts[netloc] = t
+        return t
+
+
+def configure(rate: float = RATE, burst: int = BURST, in_flight: int = IN_FLIGHT) -> None:
+    global RATE, BURST, IN_FLIGHT
+    RATE = max(MIN_RATE, rate)
+    BURST = max(1, burst)
+    IN_FLIGHT = max(1, in_flight)
+    with _lock:
+        for t in _hosts.values():
+            t.configure(RATE, BURST, IN_FLIGHT)
+
+
+def configure_from(settings) -> None:
+    configure(settings.valueFloat("http/rate", RATE),
+              settings.valueInt("http/burst", BURST),
+              settings.valueInt("http/in_flight", IN_FLIGHT))
@@ -2,10 +2,8 @@
 import os
 import sys
 import threading
-import time
 import webbrowser
 from concurrent.futures import Future
-from typing import Callable
 
 from PySide6 import QtWidgets, QtCore
 from PySide6.QtCore import Slot, QSize, Signal, QCoreApplication, QThread
@@ -25,6 +23,7 @@ from myqt.MyQtCommon import QtHBox, QtVBox, MyButton, fa_icon
 from myqt.MyQtFlow import MyQtScrollableFlow
 from myqt.QtImage import MyImageBox, MyImageSource, MyImageDialog
 from myqt.MyQtSetting import MySetting, SettingDialog
+from myqt.QtCacheSetting import cache_defaults, configure_caches, log_cache_stats
 from myqt.MyQtWorker import MyThread, MyThreadPool
 
 
@@ -35,7 +34,6 @@ class MainWidget(QtWidgets.QWidget):
 
     progress_reset_signal = Signal(int)
     progress_signal = Signal(int)
-    page_display = Signal(int)
     update_thread_count_signal = Signal(str)
 
     def __init__(self):
@@ -147,7 +145,6 @@ class MainWidget(QtWidgets.QWidget):
         self.info_out.connect(self.action_info_out, Qt.QueuedConnection)
         self.image_signal.connect(self.action_show_img, Qt.QueuedConnection)
         self.new_image_signal.connect(self.action_show_new_img, Qt.QueuedConnection)
-        self.page_display.connect(self.action_show_page, Qt.QueuedConnection)
 
         TextOut.out = self.info_out.emit
         # self.model.directoryLoaded.connect(self.model_loaded)
@@ -164,6 +161,8 @@ class MainWidget(QtWidgets.QWidget):
         thumb_y = settings.valueInt("image/thumb/height", 200)
         self.thumb_size = QSize(thumb_w, thumb_y)
 
+        configure_caches(settings)
+
         win_w = settings.valueInt("main/width", screen.availableGeometry().width() - 50)
         win_h = settings.valueInt("main/height", screen.availableGeometry().height() - 50)
         print(win_w, win_h)
@@ -196,7 +195,7 @@ class MainWidget(QtWidgets.QWidget):
 
     @Slot()
     def action_settings(self):
-        dialog = SettingDialog(self, settings, "bitgirl")
+        dialog = SettingDialog(self, settings, "bitgirl", "http")
         if dialog.exec():
             self.apply_settings()
         dialog.deleteLater()
@@ -210,12 +209,10 @@ class MainWidget(QtWidgets.QWidget):
     @Slot()
     def action_show_img(self, _, as_size, img: MyImageSource) -> None:
         self.image_flow.show_img(as_size, img, self.action_show_large_img)
-        QCoreApplication.processEvents()
 
     @Slot()
     def action_show_new_img(self, _, as_size, img: MyImageSource) -> None:
         self.image_new_flow.show_img(as_size, img, self.action_show_large_img)
-        QCoreApplication.processEvents()
 
     @Slot()
     def action_find_dup(self):
@@ -293,53 +290,27 @@ class MainWidget(QtWidgets.QWidget):
                 # self.model_loaded(None)
 
     @Slot()
-    def action_show_images_local(self, page=0):
+    def action_show_images_local(self):
         if self.model.select is not None:
-            MyThreadPool.start("image_flow", self.action_show_images_start, None, None,
-                               self.async_load_images_local,
-                               self.model.select, self.thumb_size, page, can_cancel=True)
+            MyThreadPool.start("image_flow", self.action_show_images_start, self.action_show_images_list, None,
+                               self.async_list_images_local, self.model.select)
 
     def action_show_images_start(self):
         self.image_flow.clearAll()
         self.image_flow.group_by_date = True
 
     @Slot()
-    def action_show_page(self, num: int):
-        w = MyButton("1", self.action_show_images_local, param=[0])
-        self.image_flow.addWidget(w)
-        for i in range(num):
-            w = MyButton(str(i + 2), self.action_show_images_local, param=[i + 1])
-            self.image_flow.addWidget(w)
-
-    def async_load_images_local(self, folder, as_size, page, check_cancel: Callable[[], bool] = None):
+    def action_show_images_list(self, files: list) -> None:
+        self.image_flow.show_paths(files, self.thumb_size, self.action_show_large_img)
+
+    def async_list_images_local(self, folder) -> list:
         files = list_jpg(folder, no_folder_img=True)
         files.sort(reverse=True)
 
         InfoImage.update_count(folder, len(files))
 
-        page_size = 300
-
-        p = int(len(files) / page_size)
-        self.page_display.emit(p)
-
-        files = files[page * page_size:(page + 1) * page_size]
-
-        self.progress_reset_signal.emit(len(files))
-
-        progress = 0
-
-        for f in files:
-            progress += 1
-            self.progress_signal.emit(progress)
-            file = f.replace("\\", "/")
-            img = MyImageSource(file, self.thumb_size)
-            self.image_signal.emit(file, as_size, img)
-            if check_cancel and check_cancel():
-                self.progress_reset_signal.emit(1)
-                self.progress_signal.emit(1)
-                break
-            time.sleep(0.01)
-        self.info_out.emit(f"{folder}: {progress} / {len(files)}")
+        self.info_out.emit(f"{folder}: {len(files)}")
+        return [f.replace("\\", "/") for f in files]
 
     @Slot()
     def action_show_large_img(self, path, thumb, auto_confirm):
@@ -434,6 +405,7 @@ class MainWidget(QtWidgets.QWidget):
         settings.setValue("bitgirl/splitterSizes", self.splitter_right.saveState())
         settings.setValue("main/width", self.width())
         settings.setValue("main/height", self.height())
+        log_cache_stats()
         self.deleteLater()
         self.close()
         self.destroy()
@@ -453,6 +425,7 @@ if __name__ == '__main__':
         settings.setValue("bitgirl/root", "X:/Image/Twitter")
     if not settings.contains("bitgirl/download_retry"):
         settings.setValue("bitgirl/download_retry", 10)
+    cache_defaults(settings)
 
     print("Create App")
 
@@ -2,9 +2,8 @@
 import asyncio
 import os
 import sys
-import time
 import webbrowser
-from typing import AnyStr, Callable
+from typing import AnyStr
 
 from PySide6 import QtWidgets, QtCore
 from PySide6.QtCore import *
@@ -25,6 +24,7 @@ from myqt.MyQtCommon import QtHBox, QtVBox, MyButton, fa_icon
 from myqt.MyQtFlow import MyQtScrollableFlow
 from myqt.QtImage import MyImageBox, MyImageSource, MyImageDialog
 from myqt.MyQtSetting import MySetting, SettingDialog
+from myqt.QtCacheSetting import cache_defaults, configure_caches, log_cache_stats
 from myqt.MyQtWorker import MyThread, MyThreadPool
 
 
@@ -34,7 +34,6 @@ class MainWidget(QtWidgets.QWidget):
     new_image_signal = Signal(str, QSize, MyImageSource)
     progress_reset_signal = Signal(int)
     progress_signal = Signal(int)
-    page_display = Signal(int)
     refresh_and_select = Signal(str)
 
     def __init__(self):
@@ -270,7 +269,6 @@ class MainWidget(QtWidgets.QWidget):
         self.info_out.connect(self.action_info_out, Qt.QueuedConnection)
         self.image_signal.connect(self.action_show_img, Qt.QueuedConnection)
         self.new_image_signal.connect(self.action_show_new_img, Qt.QueuedConnection)
-        self.page_display.connect(self.action_show_page, Qt.QueuedConnection)
 
         self.refresh_and_select.connect(self.refresh_and_select_path, Qt.QueuedConnection)
 
@@ -309,6 +307,8 @@ class MainWidget(QtWidgets.QWidget):
         thumb_y = settings.valueInt("image/thumb/height", 200)
         self.thumb_size = QSize(thumb_w, thumb_y)
 
+        configure_caches(settings)
+
         win_w = settings.valueInt("main/width", screen.availableGeometry().width() - 50)
         win_h = settings.valueInt("main/height", screen.availableGeometry().height() - 50)
         print(win_w, win_h)
@@ -349,7 +349,7 @@ class MainWidget(QtWidgets.QWidget):
 
     @Slot()
     def action_settings(self) -> None:
-        dialog = SettingDialog(self, settings, "cosplay")
+        dialog = SettingDialog(self, settings, "cosplay", "http")
         if dialog.exec():
             self.apply_settings()
         dialog.deleteLater()
@@ -378,12 +378,10 @@ class MainWidget(QtWidgets.QWidget):
             self.image_flow.show_img(as_size, img, self.action_click_folder_image)
         else:
             self.image_flow.show_img(as_size, img, self.action_show_large_img)
-        QCoreApplication.processEvents()
 
     @Slot()
     def action_show_new_img(self, _, as_size, img: MyImageSource) -> None:
         self.image_new_flow.show_img(as_size, img, self.action_show_large_img)
-        QCoreApplication.processEvents()
 
     @Slot()
     def action_find_dup(self):
@@ -432,81 +430,44 @@ class MainWidget(QtWidgets.QWidget):
         self.xin_mei_tutu.txt_url.setText(url)
 
     @Slot()
-    def action_show_images_local(self, page=0):
+    def action_show_images_local(self):
         if self.model.select is not None:
-            MyThreadPool.start("image_flow", self.action_show_images_start, self.show_info, None,
-                               self.async_load_images_local,
-                               self.model.select, self.thumb_size, page, can_cancel=True)
+            MyThreadPool.start("image_flow", self.action_show_images_start, self.action_show_images_list, None,
+                               self.async_list_images_local, self.model.select)
 
     @Slot()
-    def action_show_folder_local(self, page=0):
-        MyThreadPool.start("image_flow", self.action_show_images_start, None, None,
-                           self.async_load_folder_local,
-                           self.model.rootPath, self.thumb_size, page, can_cancel=True)
+    def action_show_folder_local(self):
+        MyThreadPool.start("image_flow", self.action_show_images_start, self.action_show_folder_list, None,
+                           self.async_list_folder_local, self.model.rootPath)
 
     def action_show_images_start(self):
         self.image_flow.clearAll()
         self.image_flow.group_by_date = False
 
     @Slot()
-    def action_show_page(self, num: int):
-        w = MyButton("1", self.action_show_images_local, param=[0])
-        self.image_flow.addWidget(w)
-        for i in range(num):
-            w = MyButton(str(i + 2), self.action_show_images_local, param=[i + 1])
-            self.image_flow.addWidget(w)
-
-    def async_load_images_local(self, folder, as_size, page, check_cancel: Callable[[], bool] = None):
-        files = sorted(list_jpg(folder, no_folder_img=True))
-
-        InfoImage.update_count(folder, len(files))
-
-        p = int(len(files) / 500)
-        self.page_display.emit(p)
-
-        files = files[page * 500:(page + 1) * 500]
+    def action_show_images_list(self, files: list) -> None:
+        self.image_flow.show_paths(files, self.thumb_size, self.action_show_large_img)
+        self.show_info()
 
-        self.progress_reset_signal.emit(len(files))
-
-        progress = 0
+    @Slot()
+    def action_show_folder_list(self, files: list) -> None:
+        self.image_flow.show_paths(files, self.thumb_size, self.action_click_folder_image)
 
-        for f in files:
-            progress += 1
-            self.progress_signal.emit(progress)
+    def async_list_images_local(self, folder) -> list:
+        files = sorted(list_jpg(folder, no_folder_img=True))
 
-            file = f.replace("\\", "/")
-            img = MyImageSource(file, self.thumb_size)
-            self.image_signal.emit(file, as_size, img)
-            if check_cancel and check_cancel():
-                self.progress_reset_signal.emit(1)
-                self.progress_signal.emit(1)
-                break
-            time.sleep(0.01)
+        InfoImage.update_count(folder, len(files))
 
-        self.info_out.emit(f"{folder}: {progress} / {len(files)}")
+        self.info_out.emit(f"{folder}: {len(files)}")
+        return [f.replace("\\", "/") for f in files]
 
-    def async_load_folder_local(self, folder, as_size, page, check_cancel: Callable[[], bool] = None):
+    def async_list_folder_local(self, folder) -> list:
         files = list_dir(folder)
         files = [os.path.join(f, "folder.jpg") for f in files if os.path.isdir(f)]
         files = [f for f in files if os.path.exists(f)]
 
-        self.progress_reset_signal.emit(len(files))
-
-        progress = 0
-
-        for f in files:
-            progress += 1
-            self.progress_signal.emit(progress)
-            file = f.replace("\\", "/")
-            img = MyImageSource(file, self.thumb_size)
-            self.image_signal.emit(file, as_size, img)
-            if check_cancel and check_cancel():
-                self.progress_reset_signal.emit(1)
-                self.progress_signal.emit(1)
-                break
-            time.sleep(0.01)
-
-        self.info_out.emit(f"{folder}: {progress} / {len(files)}")
+        self.info_out.emit(f"{folder}: {len(files)}")
+        return [f.replace("\\", "/") for f in files]
 
     @Slot()
     def action_open_url(self):
@@ -560,6 +521,7 @@ class MainWidget(QtWidgets.QWidget):
         settings.setValue("cosplay/splitterSizes", self.splitter_right.saveState())
         settings.setValue("main/width", self.width())
         settings.setValue("main/height", self.height())
+        log_cache_stats()
         settings.sync()
         RenameHint.save()
         self.deleteLater()
@@ -583,6 +545,7 @@ if __name__ == '__main__':
         settings.setValue("cosplay/download", "Y:/download/cosplay")
     if not settings.contains("cosplay/download_retry"):
         settings.setValue("cosplay/download_retry", 999)
+    cache_defaults(settings)
 
     print("Create App")
 
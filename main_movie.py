@@ -33,8 +33,9 @@ from myqt.MyDirModel import MyDirModel
 from myqt.MyQtCommon import QtHBox, QtVBox, MyButton, fa_icon
 from myqt.MyQtFlow import MyQtScrollableFlow
 from myqt.MyQtSetting import MySetting, SettingDialog
+from myqt.QtCacheSetting import cache_defaults, configure_caches, log_cache_stats
 from myqt.MyQtWorker import MyThread, MyThreadPool
-from myqt.QtImage import MyImageBox, MyImageSource, MyImageDialog
+from myqt.QtImage import MyImageBox, MyImageSource, MyImageDialog, MyImageLoader
 from myqt.QtVideo import MyVideoDialog, QtVideoDialog
 
 
@@ -158,6 +159,7 @@ class MainWidget(QtWidgets.QWidget):
         self.setLayout(layout)
 
         self.thumb_size = QSize(140, 200)
+        self.thumb_loader = MyImageLoader()
         self.selected_data: Optional[InfoMovie] = None
         self.update_delay = 0.001
         self.apply_settings()
@@ -184,6 +186,8 @@ class MainWidget(QtWidgets.QWidget):
         thumb_y = settings.valueInt("image/thumb/height", 200)
         self.thumb_size = QSize(thumb_w, thumb_y)
 
+        configure_caches(settings)
+
         win_w = settings.valueInt("main/width", screen.availableGeometry().width() - 50)
         win_h = settings.valueInt("main/height", screen.availableGeometry().height() - 50)
         print(win_w, win_h)
@@ -192,10 +196,14 @@ class MainWidget(QtWidgets.QWidget):
 
         # self.set_dir(settings.value("bitgirl/root"))
         self.movie_base = settings.valueStr("movie/base")
+        MovieParser.fan_out = settings.valueInt("movie/fan_out", 0) == 1
+        MovieParser.fanza_grace = settings.valueInt("movie/fanza_grace_ms", 1500) / 1000
         if not os.path.exists(self.movie_base):
             self.movie_base = "D:/AV"
 
-        load_movie_db("D:/AV")  # self.movie_base)
+        load_movie_db("D:/AV", use_catalog=settings.valueInt("movie/sqlite", 0) == 1,
+                      lazy=settings.valueInt("movie/lazy", 0) == 1,
+                      binary=settings.valueInt("movie/binary", 0) == 1)  # self.movie_base)
 
         # self.selected_path = settings.valueStr("movie/last_selection", None)
 
@@ -210,7 +218,7 @@ class MainWidget(QtWidgets.QWidget):
 
     @Slot()
     def action_search_movie(self):
-        dial = InputDialog()
+        dial = InputDialog(complete=MovieCache.complete)
         if dial.exec():
             mid = dial.get_result()
             if mid:
@@ -264,7 +272,7 @@ class MainWidget(QtWidgets.QWidget):
 
     @Slot()
     def action_settings(self):
-        dialog = SettingDialog(self, settings, "movie")
+        dialog = SettingDialog(self, settings, "movie", "http")
         if dialog.exec():
             self.apply_settings()
 
@@ -285,12 +293,11 @@ class MainWidget(QtWidgets.QWidget):
             if not path.startswith(self.model.select):
                 return
         self.image_flow.show_img(as_size, img, self.action_show_large_img)
-        QCoreApplication.processEvents()
+        self.thumb_loader.shown()
 
     @Slot()
     def action_show_new_img(self, _, as_size, img: MyImageSource) -> None:
         self.image_new_flow.show_img(as_size, img, self.action_show_large_img)
-        QCoreApplication.processEvents()
 
     @Slot()
     def action_rename(self):
@@ -457,15 +464,17 @@ class MainWidget(QtWidgets.QWidget):
 
         progress = 0
 
-        for f in files:
+        files = [f.replace("\\", "/") for f in files]
+        for file, img in self.thumb_loader.load(files, as_size, lambda: QThread.isInterruptionRequested(thread)):
             progress += 1
             self.progress_signal.emit(progress)
-            file = f.replace("\\", "/")
-            img = MyImageSource(file, as_size)
             self.image_signal.emit(file, as_size, img, False)
             if QThread.isInterruptionRequested(thread):
                 break
-            time.sleep(0.01)
+        # the loader also stops quietly when cancelled while waiting for the gallery
+        if QThread.isInterruptionRequested(thread):
+            self.progress_reset_signal.emit(1)
+            self.progress_signal.emit(1)
         return True
 
     @Slot()
@@ -581,6 +590,7 @@ class MainWidget(QtWidgets.QWidget):
         settings.setValue("movie/splitterSizes", self.splitter_right.saveState())
         settings.setValue("main/width", self.width())
         settings.setValue("main/height", self.height())
+        log_cache_stats()
         settings.sync()
         self.deleteLater()
         self.close()
@@ -611,6 +621,17 @@ if __name__ == '__main__':
         settings.setValue("movie/download", "C:/Users/baha2/Downloads")
     if not settings.contains("movie/force_scan"):
         settings.setValue("movie/force_scan", "0")
+    if not settings.contains("movie/sqlite"):
+        settings.setValue("movie/sqlite", "0")
+    if not settings.contains("movie/lazy"):
+        settings.setValue("movie/lazy", "0")
+    if not settings.contains("movie/binary"):
+        settings.setValue("movie/binary", "0")
+    if not settings.contains("movie/fan_out"):
+        settings.setValue("movie/fan_out", "0")
+    if not settings.contains("movie/fanza_grace_ms"):
+        settings.setValue("movie/fanza_grace_ms", "1500")
+    cache_defaults(settings)
 
     print("Create App")
 
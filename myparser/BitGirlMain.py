@@ -9,7 +9,8 @@ from PIL import Image  # Pillow
 from PySide6.QtCore import QSize, Signal
 from bs4 import Tag
 
-from MyCommon import list_jpg, str_to_date, download_with_retry, join_path
+from MyCommon import list_jpg, str_to_date, download_with_retry, join_path, atomic_write, \
+    RetryPolicy
 from TextOut import TextOut
 from myparser.ParserCommon import get_soup, get_soup_from_text, get_html_async
 from myqt.MyQtWorker import MyThreadPool
@@ -99,10 +100,9 @@ def write_hash_file(folder, hashes=None, exist_hash=None):
         hashes = {}
     hash_file = os.path.join(folder, "hash.json")
     hash_path = os.path.join(folder, "hash_path.json")
-    with open(hash_path, 'w') as f:
-        json.dump(exist_hash, f, ensure_ascii=False)
-    with open(hash_file, 'w') as f:
-        json.dump(hashes, f, ensure_ascii=False)
+    # ascii json reads the same whatever encoding read_hash_file opens it with
+    atomic_write(hash_path, json.dumps(exist_hash).encode("ascii"))
+    atomic_write(hash_file, json.dumps(hashes).encode("ascii"))
 
 
 def check(soup):
@@ -236,7 +236,8 @@ async def parse_async(loop, url: AnyStr, date_after: str,
         hashes, exist_hash, write_hash = read_hash_file(folder)
 
         # jobs = chunks(list(map(lambda x: (loop, x[0], None, join_path(folder, x[1]), retry), url_list)), 30)
-        jobs = list(map(lambda x: (loop, x[0], None, join_path(folder, x[1]), retry), url_list))
+        policy = RetryPolicy.for_job(retry, len(url_list))
+        jobs = list(map(lambda x: (loop, x[0], None, join_path(folder, x[1]), retry, None, policy), url_list))
 
         async def download_and_show(params: tuple):
             d_url, img_path = await download_with_retry(*params)
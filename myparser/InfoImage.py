@@ -1,7 +1,7 @@
 import json
 import os
 
-from MyCommon import join_path
+from MyCommon import join_path, atomic_write
 
 
 class InfoImage:
@@ -27,12 +27,9 @@ class InfoImage:
 
             info_path = join_path(path, InfoImage.FILE)
             try:
-                with open(info_path, 'w', encoding='utf-8') as f:
-                    json.dump(data, f, ensure_ascii=False, indent=4)
+                atomic_write(info_path, json.dumps(data, ensure_ascii=False, indent=4).encode("utf-8"))
             except Exception as e:
                 print(e)
-            finally:
-                f.close()
 
     @staticmethod
     def load_info(path):
@@ -13,7 +13,8 @@ import aiofiles
 from PySide6.QtCore import Signal
 
 from FileCopyProgress import CopyProgress
-from MyCommon import download, valid_folder_name, join_path, list_dir, load_json, save_json, async_save_json
+from MyCommon import download, valid_folder_name, join_path, list_dir, load_json, save_json, async_save_json, \
+    atomic_write
 from TextOut import TextOut
 from myparser import get_soup
 from myparser.InfoMovieItem import InfoMovieItem
@@ -48,14 +49,14 @@ class InfoMaker(InfoMovieItem):
         InfoMaker.mod_dir = InfoMovieItem._load(InfoMaker.path_d)
 
     @staticmethod
-    def save() -> None:
-        InfoMovieItem._save(InfoMaker.path, InfoMaker.data)
-        InfoMovieItem._save(InfoMaker.path_d, InfoMaker.mod_dir)
+    def save() -> bool:
+        done = InfoMovieItem._save(InfoMaker.path, InfoMaker.data)
+        return InfoMovieItem._save(InfoMaker.path_d, InfoMaker.mod_dir) and done
 
     @staticmethod
-    async def async_save():
-        await InfoMovieItem._async_save(InfoMaker.path, InfoMaker.data)
-        await InfoMovieItem._async_save(InfoMaker.path_d, InfoMaker.mod_dir)
+    async def async_save() -> bool:
+        done = await InfoMovieItem._async_save(InfoMaker.path, InfoMaker.data)
+        return await InfoMovieItem._async_save(InfoMaker.path_d, InfoMaker.mod_dir) and done
 
     @staticmethod
     def dir(name: AnyStr) -> AnyStr:
@@ -65,11 +66,11 @@ class InfoMaker(InfoMovieItem):
 
     @staticmethod
     def add(name: AnyStr, urls=None) -> AnyStr:
-        return InfoMovieItem._add(InfoMaker.data, name, urls)
+        return InfoMaker._add(InfoMaker.data, name, urls)
 
     @staticmethod
     def get(name: AnyStr, urls=None) -> Optional[tuple[AnyStr, dict]]:
-        return InfoMovieItem._get(InfoMaker.data, name, urls)
+        return InfoMaker._get(InfoMaker.data, name, urls)
 
 
 class InfoLabel(InfoMovieItem):
@@ -88,26 +89,26 @@ class InfoLabel(InfoMovieItem):
         InfoLabel.modify = InfoMovieItem._load(InfoLabel.path_m)
 
     @staticmethod
-    def save() -> None:
-        InfoMovieItem._save(InfoLabel.path, InfoLabel.data)
-        InfoMovieItem._save(InfoLabel.path_m, InfoLabel.modify)
+    def save() -> bool:
+        done = InfoMovieItem._save(InfoLabel.path, InfoLabel.data)
+        return InfoMovieItem._save(InfoLabel.path_m, InfoLabel.modify) and done
 
     @staticmethod
-    async def async_save():
-        await InfoMovieItem._async_save(InfoLabel.path, InfoLabel.data)
-        await InfoMovieItem._async_save(InfoLabel.path_m, InfoLabel.modify)
+    async def async_save() -> bool:
+        done = await InfoMovieItem._async_save(InfoLabel.path, InfoLabel.data)
+        return await InfoMovieItem._async_save(InfoLabel.path_m, InfoLabel.modify) and done
 
     @staticmethod
     def add(name: AnyStr, urls=None) -> AnyStr:
         if name in InfoLabel.modify:
             name = InfoLabel.modify[name]
-        return InfoMovieItem._add(InfoLabel.data, name, urls)
+        return InfoLabel._add(InfoLabel.data, name, urls)
 
     @staticmethod
     def get(name: AnyStr, urls=None) -> Optional[tuple[AnyStr, dict]]:
         if name in InfoLabel.modify:
             name = InfoLabel.modify[name]
-        return InfoMovieItem._get(InfoLabel.data, name, urls)
+        return InfoLabel._get(InfoLabel.data, name, urls)
 
 
 class InfoDirector(InfoMovieItem):
@@ -121,20 +122,20 @@ class InfoDirector(InfoMovieItem):
         InfoDirector.data = InfoMovieItem._load(InfoDirector.path)
 
     @staticmethod
-    def save() -> None:
-        InfoMovieItem._save(InfoDirector.path, InfoDirector.data)
+    def save() -> bool:
+        return InfoMovieItem._save(InfoDirector.path, InfoDirector.data)
 
     @staticmethod
-    async def async_save():
-        await InfoMovieItem._async_save(InfoDirector.path, InfoDirector.data)
+    async def async_save() -> bool:
+        return await InfoMovieItem._async_save(InfoDirector.path, InfoDirector.data)
 
     @staticmethod
     def add(name: AnyStr, urls=None) -> AnyStr:
-        return InfoMovieItem._add(InfoDirector.data, name, urls)
+        return InfoDirector._add(InfoDirector.data, name, urls)
 
     @staticmethod
     def get(name: AnyStr, urls=None) -> Optional[tuple[AnyStr, dict]]:
-        return InfoMovieItem._get(InfoDirector.data, name, urls)
+        return InfoDirector._get(InfoDirector.data, name, urls)
 
 
 class InfoSeries(InfoMovieItem):
@@ -148,20 +149,20 @@ class InfoSeries(InfoMovieItem):
         InfoSeries.data = InfoMovieItem._load(InfoSeries.path)
 
     @staticmethod
-    def save() -> None:
-        InfoMovieItem._save(InfoSeries.path, InfoSeries.data)
+    def save() -> bool:
+        return InfoMovieItem._save(InfoSeries.path, InfoSeries.data)
 
     @staticmethod
-    async def async_save():
-        await InfoMovieItem._async_save(InfoSeries.path, InfoSeries.data)
+    async def async_save() -> bool:
+        return await InfoMovieItem._async_save(InfoSeries.path, InfoSeries.data)
 
     @staticmethod
     def add(name: AnyStr, urls=None) -> AnyStr:
-        return InfoMovieItem._add(InfoSeries.data, name, urls)
+        return InfoSeries._add(InfoSeries.data, name, urls)
 
     @staticmethod
     def get(name: AnyStr, urls=None) -> Optional[tuple[AnyStr, dict]]:
-        return InfoMovieItem._get(InfoSeries.data, name, urls)
+        return InfoSeries._get(InfoSeries.data, name, urls)
 
 
 class InfoKeyword(InfoMovieItem):
@@ -181,24 +182,24 @@ class InfoKeyword(InfoMovieItem):
         InfoKeyword.data = InfoMovieItem._load(InfoKeyword.path)
 
     @staticmethod
-    def save() -> None:
-        InfoMovieItem._save(InfoKeyword.path, InfoKeyword.data)
+    def save() -> bool:
         f = join_path(os.path.dirname(InfoKeyword.path), InfoKeyword.FILTER_FILE)
         save_json(f, InfoKeyword.FILTER)
+        return InfoMovieItem._save(InfoKeyword.path, InfoKeyword.data)
 
     @staticmethod
-    async def async_save():
-        await InfoMovieItem._async_save(InfoKeyword.path, InfoKeyword.data)
+    async def async_save() -> bool:
         f = join_path(os.path.dirname(InfoKeyword.path), InfoKeyword.FILTER_FILE)
         await async_save_json(f, InfoKeyword.FILTER)
+        return await InfoMovieItem._async_save(InfoKeyword.path, InfoKeyword.data)
 
     @staticmethod
     def add(name: AnyStr, urls=None) -> AnyStr:
-        return InfoMovieItem._add(InfoKeyword.data, name, urls)
+        return InfoKeyword._add(InfoKeyword.data, name, urls)
 
     @staticmethod
     def get(name: AnyStr, urls=None) -> Optional[tuple[AnyStr, dict]]:
-        return InfoMovieItem._get(InfoKeyword.data, name, urls)
+        return InfoKeyword._get(InfoKeyword.data, name, urls)
 
 
 class InfoActor(InfoMovieItem):
@@ -225,6 +226,7 @@ class InfoActor(InfoMovieItem):
                     age = int(year_difference - one_or_zero)
                 except Exception as e:
                     v.pop('birth')
+                    InfoActor.touch()
                     print(k, v, e)
             if 'ruby' in v:
                 ruby = v['ruby']
@@ -259,6 +261,7 @@ class InfoActor(InfoMovieItem):
                 return age
             except Exception as e:
                 InfoActor.data[name].pop('birth')
+                InfoActor.touch()
                 print(e)
 
         return None
@@ -269,12 +272,12 @@ class InfoActor(InfoMovieItem):
         InfoActor.data = InfoMovieItem._load(InfoActor.path)
 
     @staticmethod
-    def save() -> None:
-        InfoMovieItem._save(InfoActor.path, InfoActor.data)
+    def save() -> bool:
+        return InfoMovieItem._save(InfoActor.path, InfoActor.data)
 
     @staticmethod
-    async def async_save():
-        await InfoMovieItem._async_save(InfoActor.path, InfoActor.data)
+    async def async_save() -> bool:
+        return await InfoMovieItem._async_save(InfoActor.path, InfoActor.data)
 
     @staticmethod
     def link(name: AnyStr, new_name: AnyStr) -> AnyStr:
@@ -296,12 +299,15 @@ class InfoActor(InfoMovieItem):
             InfoActor.data[link_to]["other"] = [link_from]
         else:
             InfoActor.data[link_to]["other"].append(link_from)
+        InfoActor.touch()
 
     @staticmethod
     def remove_link(remove_link_from):
         name = InfoActor.data[remove_link_from].pop("link", None)
         if name in InfoActor.data:
             InfoActor.data[name]["other"].remove(remove_link_from)
+        if name is not None:
+            InfoActor.touch()
 
     @staticmethod
     def get_link(name: AnyStr) -> AnyStr:
@@ -310,6 +316,7 @@ class InfoActor(InfoMovieItem):
                 name = InfoActor.data[name]['link']
         else:
             InfoActor.data[name] = {}
+            InfoActor.touch()
         return name
 
     @staticmethod
@@ -319,15 +326,19 @@ class InfoActor(InfoMovieItem):
                 if InfoActor.data[name]["fanza"] != urls["fanza"]:
                     name = f"{name}_f{urls['fanza']}"
 
-        return InfoMovieItem._add(InfoActor.data, name, urls)
+        return InfoActor._add(InfoActor.data, name, urls)
 
     @staticmethod
     def get(name: AnyStr, urls=None) -> Optional[tuple[AnyStr, dict]]:
-        return InfoMovieItem._get(InfoActor.data, name, urls)
+        result = InfoActor._get(InfoActor.data, name, urls)
+        if result and urls and "profile" in urls and InfoMovieItem.catalog:
+            InfoMovieItem.catalog.set_alias(name, InfoMovieItem.catalog.actor_alias(result[1]))
+        return result
 
     @staticmethod
     def guess_name(name: AnyStr) -> list:
-
+        if InfoMovieItem.catalog:
+            return InfoMovieItem.catalog.guess_actor(name)
         return [k for k, v in InfoActor.data.items()
                 if "profile" in v and "別名" in v["profile"][1] and name in v["profile"][1]["別名"]]
 
@@ -336,7 +347,7 @@ class InfoActor(InfoMovieItem):
         url = f"https://nakiny.com/av-search?actress={name}"
         print(url)
 
-        soup = get_soup(url)
+        soup = get_soup(url, expect=b"av_serch_img_profile_right_wrap")
 
         photo = soup.select_one('div[class=av_serch_img_profile_left_wrap]')
         if photo:
@@ -373,7 +384,7 @@ class InfoActor(InfoMovieItem):
         print(url)
 
         profile = {}
-        soup = get_soup(url, timeout=(20.0, 30.0))
+        soup = get_soup(url, timeout=(20.0, 30.0), expect=b"ActressProfile")
 
         if soup:
             data = soup.select_one('div[class*=ActressProfile]')
@@ -560,12 +571,13 @@ class InfoMovie:
         try:
             if self.back_img_url and not self.back_img_path:
                 back_img_path = self.get_back_img_path()
-                download(self.back_img_url, None, back_img_path)
-                self.back_img_path = back_img_path
+                # a failed download leaves a .part file the next save resumes from
+                if download(self.back_img_url, None, back_img_path)[0]:
+                    self.back_img_path = back_img_path
             if self.front_img_url and not self.front_img_path:
                 front_img_path = self.get_front_img_path()
-                download(self.front_img_url, None, front_img_path)
-                self.front_img_path = front_img_path
+                if download(self.front_img_url, None, front_img_path)[0]:
+                    self.front_img_path = front_img_path
             save_info(self.path, self)
             print("Saved", self.back_img_path)
         except Exception as e:
@@ -614,13 +626,11 @@ def save_info(path: AnyStr, data: InfoMovie) -> None:
         print(path)
         info_path = join_path(path, InfoMovie.FILE)
         try:
-            with open(info_path, 'w', encoding='utf-8') as f:
-                json.dump(data.__dict__, f, ensure_ascii=False, indent=4)
-            TextOut.out(f"Save File: {info_path}")
+            raw = json.dumps(data.__dict__, ensure_ascii=False, indent=4).encode("utf-8")
+            if atomic_write(info_path, raw):
+                TextOut.out(f"Save File: {info_path}")
         except Exception as e:
             print(e)
-        finally:
-            f.close()
 
 
 if __name__ == '__main__':
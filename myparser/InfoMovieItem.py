@@ -1,76 +1,277 @@
+import asyncio
 import json
-import shutil
+import os
+import sys
+import threading
+import time
 from typing import AnyStr, Tuple, TypeVar, Optional
 
-import aiofiles
 import jsons
 
-from MyCommon import async_save_json
+from MyCommon import atomic_write, read_checked, mark_restored, BACKUP_SUFFIX
 from TextOut import TextOut
+from myparser import MovieSnapshot
+from myparser.MovieCatalog import MovieCatalog
 
 T = TypeVar('T')
 
 
 class InfoMovieItem:
+    catalog: Optional[MovieCatalog] = None
+    binary = False
+    flusher: Optional["RegistryFlusher"] = None
+    flush_lock = threading.Lock()
+    # parsers add names from several worker threads at once
+    data_lock = threading.RLock()
+    generation = 0
+    saved_generation = 0
+
+    @classmethod
+    def touch(cls) -> None:
+        cls.generation += 1
+        if InfoMovieItem.flusher is not None:
+            InfoMovieItem.flusher.schedule()
+
+    @classmethod
+    def dirty(cls) -> bool:
+        return cls.generation != cls.saved_generation
+
+    @classmethod
+    def flush(cls) -> bool:
+        with InfoMovieItem.flush_lock:
+            if not cls.dirty():
+                return True
+            generation = cls.generation
+            if cls.save():
+                cls.saved_generation = generation
+                return True
+        return False
+
+    @classmethod
+    async def async_flush(cls) -> bool:
+        # one executor call takes and releases flush_lock itself, no pool thread
+        # waits on it for a coroutine and a cancelled caller cannot leak it
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, cls.flush)
+
     @staticmethod
-    def _add(data: dict, name: T, urls=None) -> T:
+    def _intern(name: T) -> T:
+        if isinstance(name, str):
+            return sys.intern(name)
+        return name
+
+    @classmethod
+    def _add(cls, data: dict, name: T, urls=None) -> T:
+        name = InfoMovieItem._intern(name)
         if name:
-            if name in data:
-                if urls:
-                    data[name].update(urls)
-            else:
-                if urls:
-                    data[name] = urls
+            with InfoMovieItem.data_lock:
+                if name in data:
+                    if urls:
+                        data[name].update(urls)
+                        cls.touch()
                 else:
-                    data[name] = {}
+                    if urls:
+                        data[name] = urls
+                    else:
+                        data[name] = {}
+                    cls.touch()
         return name
 
-    @staticmethod
-    def _get(data: dict, name: T, urls=None) -> Optional[Tuple[T, dict]]:
+    @classmethod
+    def _get(cls, data: dict, name: T, urls=None) -> Optional[Tuple[T, dict]]:
+        name = InfoMovieItem._intern(name)
         if name:
-            if name in data:
-                if urls:
-                    data[name].update(urls)
-            else:
-                if urls:
-                    data[name] = urls
+            with InfoMovieItem.data_lock:
+                if name in data:
+                    if urls:
+                        data[name].update(urls)
+                        cls.touch()
                 else:
-                    data[name] = {}
-            return name, data[name]
+                    if urls:
+                        data[name] = urls
+                    else:
+                        data[name] = {}
+                    cls.touch()
+                return name, data[name]
         return None
 
     @staticmethod
     def _load(path):
+        if InfoMovieItem.catalog:
+            file = os.path.basename(path)
+            data = InfoMovieItem.catalog.load_registry(file)
+            if not data:
+                data = InfoMovieItem._load_file(path)
+                if data:
+                    InfoMovieItem.catalog.save_registry(file, data)
+            return InfoMovieItem._intern_keys(data)
+        return InfoMovieItem._intern_keys(InfoMovieItem._load_file(path))
+
+    @staticmethod
+    def _intern_keys(data: dict) -> dict:
+        # movie records intern the same names, so they share the key strings
+        return {InfoMovieItem._intern(k): v for k, v in data.items()}
+
+    @staticmethod
+    def _load_file(path):
+        # whichever was written last, also after switching binary on or off
+        if MovieSnapshot.newer(path):
+            data = MovieSnapshot.load(MovieSnapshot.binary_path(path))
+            # None also for a snapshot of another record schema, the json is used then
+            if data is not None:
+                return data
+        return InfoMovieItem._load_json(path)
+
+    @staticmethod
+    def _load_json(path):
+        # a torn or corrupt file falls back to the previous generation
+        for p in (path, path + BACKUP_SUFFIX):
+            raw = read_checked(p)
+            if raw is None:
+                continue
+            try:
+                data = json.loads(raw)
+                if p != path:
+                    TextOut.out(f"Load Backup: {p}")
+                    mark_restored(path)
+                return data
+            except Exception as e:
+                print(e)
+        return {}
+
+    @staticmethod
+    def _encode_json(data) -> bytes:
+        with InfoMovieItem.data_lock:
+            return json.dumps(jsons.dump(data), ensure_ascii=False, indent=4).encode("utf-8")
+
+    @staticmethod
+    def _save(path: AnyStr, data) -> bool:
+        if InfoMovieItem.catalog:
+            return InfoMovieItem._save_catalog(path, data)
+        if InfoMovieItem.binary:
+            return InfoMovieItem._save_binary(path, data)
         try:
-            with open(path, encoding="utf-8") as f:
-                return json.load(f)
+            raw = InfoMovieItem._encode_json(data)
         except Exception as e:
             print(e)
-            return {}
+            return False
+        if atomic_write(path, raw, checksum=True, backup=True):
+            TextOut.out(f"Save File: {path}")
+            return True
+        return False
 
     @staticmethod
-    def _save(path: AnyStr, data) -> None:
-        tmp_path = path + "_tmp"
+    async def _async_save(path: AnyStr, data) -> bool:
+        if InfoMovieItem.catalog:
+            return InfoMovieItem._save_catalog(path, data)
+        if InfoMovieItem.binary:
+            return await InfoMovieItem._async_save_binary(path, data)
+        TextOut.out(f"Start Save File: {path}")
         try:
-            d = jsons.dump(data)
-            with open(tmp_path, 'w', encoding='utf-8') as f:
-                json.dump(d, f, ensure_ascii=False, indent=4)
-            shutil.move(tmp_path, path)
-            TextOut.out(f"Save File: {path}")
+            # encode on the loop thread, the registries may change while writing
+            raw = InfoMovieItem._encode_json(data)
         except Exception as e:
             print(e)
-        finally:
-            f.close()
+            return False
+        loop = asyncio.get_running_loop()
+        if await loop.run_in_executor(None, atomic_write, path, raw, True, True):
+            TextOut.out(f"Finish Save File: {path}")
+            return True
+        return False
 
     @staticmethod
-    async def _async_save(path: AnyStr, data) -> None:
-        tmp_path = path + "_tmp"
+    def _save_binary(path: AnyStr, data) -> bool:
+        bin_path = MovieSnapshot.binary_path(path)
+        with InfoMovieItem.data_lock:
+            saved = MovieSnapshot.dump(bin_path, data)
+        if saved:
+            TextOut.out(f"Save File: {bin_path}")
+            return True
+        return False
+
+    @staticmethod
+    async def _async_save_binary(path: AnyStr, data) -> bool:
+        bin_path = MovieSnapshot.binary_path(path)
+        TextOut.out(f"Start Save File: {bin_path}")
         try:
-            TextOut.out(f"Start Save File: {path}")
-            d = jsons.dump(data)
-            await async_save_json(tmp_path, d)
-            shutil.move(tmp_path, path)
-            TextOut.out(f"Finish Save File: {path}")
+            with InfoMovieItem.data_lock:
+                raw = MovieSnapshot.encode(data)
+        except Exception as e:
+            print(e)
+            return False
+        loop = asyncio.get_running_loop()
+        if await loop.run_in_executor(None, atomic_write, bin_path, raw, True, True):
+            TextOut.out(f"Finish Save File: {bin_path}")
+            return True
+        return False
+
+    @staticmethod
+    def _save_catalog(path: AnyStr, data) -> bool:
+        try:
+            with InfoMovieItem.data_lock:
+                InfoMovieItem.catalog.save_registry(os.path.basename(path), data)
+            TextOut.out(f"Save Catalog: {path}")
+            return True
         except Exception as e:
             print(e)
+        return False
+
+
+class RegistryFlusher:
+    """Background writer for registries changed through ``touch``.
+
+    A burst of changes is written once ``DELAY`` seconds after the last one,
+    or at the latest ``MAX_DELAY`` seconds after the first.
+    """
+    DELAY = 5.0
+    MAX_DELAY = 60.0
+
+    def __init__(self, registries: list):
+        self.registries = registries
+        self.cond = threading.Condition()
+        self.first: Optional[float] = None
+        self.last: Optional[float] = None
+        self.stopped = False
+        self.thread = threading.Thread(target=self._run, name="RegistryFlusher", daemon=True)
+
+    def start(self) -> None:
+        self.thread.start()
+
+    def schedule(self) -> None:
+        with self.cond:
+            now = time.monotonic()
+            if self.first is None:
+                self.first = now
+            self.last = now
+            self.cond.notify()
+
+    def stop(self) -> None:
+        with self.cond:
+            self.stopped = True
+            self.cond.notify()
+        if self.thread.is_alive():
+            self.thread.join()
+
+    def _run(self) -> None:
+        while True:
+            with self.cond:
+                while not self.stopped:
+                    if self.first is None:
+                        self.cond.wait()
+                        continue
+                    wait = min(self.last + RegistryFlusher.DELAY,
+                               self.first + RegistryFlusher.MAX_DELAY) - time.monotonic()
+                    if wait <= 0:
+                        break
+                    self.cond.wait(wait)
+                if self.stopped:
+                    return
+                self.first = self.last = None
+            self.flush()
 
+    def flush(self) -> None:
+        for r in self.registries:
+            try:
+                r.flush()
+            except Exception as e:
+                print(e)
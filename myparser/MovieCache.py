@@ -1,14 +1,20 @@
 import asyncio
 import multiprocessing
 import os
-from typing import Optional
+import threading
+from typing import Optional, Union
 
 import jsons
 from PySide6.QtCore import QCoreApplication
 
 from MyCommon import join_path
 from myparser.InfoMovie import InfoDirector, InfoLabel, InfoMaker, InfoSeries, InfoKeyword, InfoActor, InfoMovie
-from myparser.InfoMovieItem import InfoMovieItem
+from myparser.InfoMovieItem import InfoMovieItem, RegistryFlusher
+from myparser.MovieCatalog import MovieCatalog
+from myparser.MovieIndex import MovieIndex
+from myparser.MovieJournal import MovieJournal
+from myparser.MovieRecord import MovieRecord
+from myparser.MovieStore import LazyMovieStore
 from myqt.MyQtWorker import MyThreadPool
 
 
@@ -24,17 +30,18 @@ class MovieCacheLite(InfoMovieItem):
         # print(MovieCacheLite.data)
 
     @staticmethod
-    def save():
-        InfoMovieItem._save(MovieCacheLite.path, MovieCacheLite.data)
+    def save() -> bool:
+        return InfoMovieItem._save(MovieCacheLite.path, MovieCacheLite.data)
 
     @staticmethod
-    async def async_save():
-        await InfoMovieItem._async_save(MovieCacheLite.path, MovieCacheLite.data)
+    async def async_save() -> bool:
+        return await InfoMovieItem._async_save(MovieCacheLite.path, MovieCacheLite.data)
 
     @staticmethod
     def put(m: dict):
         print("put", m['mid'])
         MovieCacheLite.data[m['mid']] = m
+        MovieCacheLite.touch()
         # print(MovieCache.data)
 
     @staticmethod
@@ -45,92 +52,224 @@ class MovieCacheLite(InfoMovieItem):
 
 
 class MovieCache(InfoMovieItem):
-    data: dict[str, InfoMovie] = {}
+    data: Union[dict[str, MovieRecord], LazyMovieStore] = {}
     path = ""
     FILE = "py_movie.txt"
+    COMPACT_LIMIT = 2000
+    journal: Optional[MovieJournal] = None
+    compact_lock = threading.Lock()
+    index = MovieIndex()
 
     @staticmethod
-    def load(path):
+    def _make(d: dict) -> MovieRecord:
+        return MovieRecord.from_dict(d)
+
+    @staticmethod
+    def load(path, lazy: bool = False):
         MovieCache.path = join_path(path, MovieCache.FILE)
-        data = InfoMovieItem._load(MovieCache.path)
-        for k, d in data.items():
-            m: InfoMovie = InfoMovie.__new__(InfoMovie)
-            m.__dict__.update(d)
-            MovieCache.data[k] = m
+        catalog = InfoMovieItem.catalog
+        if isinstance(MovieCache.data, LazyMovieStore):
+            MovieCache.data.close()
+        MovieCache.data = {}
+        MovieCache.journal = None
+        if catalog and catalog.movie_count():
+            for k, d in catalog.load_movies().items():
+                MovieCache.data[k] = MovieCache._make(d)
+            MovieCache.index.rebuild(MovieCache.data)
+            return
+        if lazy and not catalog and MovieCache._load_lazy(path):
+            MovieCache.index.rebuild(MovieCache.data)
+            return
+        journal = MovieJournal(MovieCache.path)
+        MovieCache.data = MovieCache._load_snapshot(journal)
+        if catalog:
+            # first start with the catalog, import the json snapshot and journal
+            catalog.put_movies({k: r.to_dict() for k, r in MovieCache.data.items()})
+        else:
+            MovieCache.journal = journal
+        MovieCache.index.rebuild(MovieCache.data)
         # print(MovieCacheLite.data)
 
+    @staticmethod
+    def _load_snapshot(journal: MovieJournal) -> dict[str, MovieRecord]:
+        data = {k: MovieCache._make(d) for k, d in InfoMovieItem._load_file(MovieCache.path).items()}
+        replayed = journal.replay(data, MovieCache._make)
+        if replayed:
+            print("journal", replayed)
+        return data
+
+    @staticmethod
+    def _load_lazy(path) -> bool:
+        store = LazyMovieStore(join_path(path, LazyMovieStore.FILE), MovieCache._make, MovieRecord.to_dict,
+                               summary=MovieIndex.summary)
+        if not os.path.exists(store.path):
+            # first lazy start, convert the json snapshot
+            data = MovieCache._load_snapshot(MovieJournal(MovieCache.path))
+            if not store.write_snapshot((data, set())):
+                return False
+        store.open()
+        journal = MovieJournal(store.path)
+        replayed = journal.replay(store, MovieCache._make)
+        if replayed:
+            print("journal", replayed)
+        MovieCache.data = store
+        MovieCache.journal = journal
+        return True
+
+    @staticmethod
+    def lazy() -> bool:
+        return isinstance(MovieCache.data, LazyMovieStore)
+
     @staticmethod
     def save():
-        InfoMovieItem._save(MovieCache.path, MovieCache.data)
+        if InfoMovieItem.catalog:
+            InfoMovieItem.catalog.commit()
+            return
+        snapshot = MovieCache._compact_start()
+        if snapshot is not None:
+            MovieCache._compact_run(snapshot)
 
     @staticmethod
     async def async_save():
-        await InfoMovieItem._async_save(MovieCache.path, MovieCache.data)
+        if InfoMovieItem.catalog:
+            InfoMovieItem.catalog.commit()
+            return
+        snapshot = MovieCache._compact_start()
+        if snapshot is not None:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, MovieCache._compact_run, snapshot)
+
+    @staticmethod
+    def compact() -> None:
+        snapshot = MovieCache._compact_start()
+        if snapshot is not None:
+            threading.Thread(target=MovieCache._compact_run, args=(snapshot,), daemon=True).start()
+
+    @staticmethod
+    def _compact_start() -> Optional[dict]:
+        if MovieCache.journal is None or not MovieCache.compact_lock.acquire(blocking=False):
+            return None
+        if not MovieCache.journal.rotate():
+            MovieCache.compact_lock.release()
+            return None
+        if MovieCache.lazy():
+            return MovieCache.data.snapshot()
+        return dict(MovieCache.data)
+
+    @staticmethod
+    def _compact_run(snapshot) -> None:
+        try:
+            if MovieCache.lazy():
+                done = MovieCache.data.write_snapshot(snapshot)
+            else:
+                done = InfoMovieItem._save(MovieCache.path, {k: r.to_dict() for k, r in snapshot.items()})
+            if done:
+                MovieCache.journal.drop_rotated()
+        finally:
+            MovieCache.compact_lock.release()
 
     @staticmethod
     def put(m: InfoMovie):
-        MovieCache.data[m.movie_id] = m
+        old = MovieCache.data.get(m.movie_id)
+        record = MovieRecord.from_movie(m)
+        MovieCache.data[m.movie_id] = record
+        MovieCache.index.add(m.movie_id, record)
+        if old is not None and old.to_dict() == m.__dict__:
+            return
+        if InfoMovieItem.catalog:
+            InfoMovieItem.catalog.put_movie(m.movie_id, m.__dict__)
+        elif MovieCache.journal:
+            MovieCache.journal.append("put", m.movie_id, m.__dict__)
+            if MovieCache.journal.count >= MovieCache.COMPACT_LIMIT:
+                MovieCache.compact()
         # print(MovieCache.data)
 
     @staticmethod
     def remove(m: InfoMovie):
-        if m.movie_id in MovieCache.data.keys():
+        if m.movie_id in MovieCache.data:
             MovieCache.data.pop(m.movie_id)
+            MovieCache.index.remove(m.movie_id)
+            if InfoMovieItem.catalog:
+                InfoMovieItem.catalog.remove_movie(m.movie_id)
+            elif MovieCache.journal:
+                MovieCache.journal.append("remove", m.movie_id)
 
     @staticmethod
     def get(mid) -> Optional[InfoMovie]:
-        if mid in MovieCache.data.keys():
-            return MovieCache.data[mid]
+        if mid in MovieCache.data:
+            return MovieCache.data[mid].to_movie()
         return None
 
     @staticmethod
     def exist(mid) -> bool:
         print(mid)
-        if mid in MovieCache.data.keys():
+        if mid in MovieCache.data:
             return True
         return False
 
     @staticmethod
     def startswith(mid) -> dict:
-        result = {}
-        for k, m in MovieCache.data.items():
-            if k.startswith(mid):
-                result[m.movie_id] = m.title
-        return result
+        if InfoMovieItem.catalog:
+            return InfoMovieItem.catalog.startswith(mid)
+        return {k: MovieCache.data[k].title for k in MovieCache.index.startswith(mid)}
+
+    @staticmethod
+    def startswith_series(series: str) -> list[InfoMovie]:
+        return [MovieCache.data[k].to_movie() for k in MovieCache.index.by_series_prefix(series)]
+
+    @staticmethod
+    def complete(mid: str, limit: int = 20) -> list[str]:
+        return MovieCache.index.startswith(mid, limit)
+
+    @staticmethod
+    def _get_all(mids) -> list[InfoMovie]:
+        return [MovieCache.data[mid].to_movie() for mid in sorted(mids) if mid in MovieCache.data]
 
     @staticmethod
     def count_by_actor(thread=None) -> dict:
-        result = {}
-        for m in MovieCache.data.values():
-            for a in m.actors:
-                if a in result:
-                    result[a] += 1
-                else:
-                    result[a] = 1
-        return result
+        if InfoMovieItem.catalog:
+            return InfoMovieItem.catalog.count_by_actor()
+        return MovieCache.index.actor_counts()
 
     @staticmethod
     def get_by_actor(actor: str, thread=None) -> list[InfoMovie]:
-        result = []
-        for m in MovieCache.data.values():
-            for a in m.actors:
-                if a == actor:
-                    result.append(m)
-                    break
-        return result
+        if InfoMovieItem.catalog:
+            return MovieCache._get_all(InfoMovieItem.catalog.mids_by_actor(actor))
+        return MovieCache._get_all(MovieCache.index.lookup("actor", actor))
 
     @staticmethod
     def get_by_keyword(keyword: str) -> list[InfoMovie]:
-        result = []
-        for m in MovieCache.data.values():
-            for k in m.keywords:
-                if k == keyword:
-                    result.append(m)
-                    break
-        return result
+        if InfoMovieItem.catalog:
+            return MovieCache._get_all(InfoMovieItem.catalog.mids_by_keyword(keyword))
+        return MovieCache._get_all(MovieCache.index.lookup("keyword", keyword))
+
+    @staticmethod
+    def get_by_maker(maker: str) -> list[InfoMovie]:
+        return MovieCache._get_all(MovieCache.index.lookup("maker", maker))
+
+    @staticmethod
+    def get_by_label(label: str) -> list[InfoMovie]:
+        return MovieCache._get_all(MovieCache.index.lookup("label", label))
+
+    @staticmethod
+    def get_by_series(series: str) -> list[InfoMovie]:
+        return MovieCache._get_all(MovieCache.index.lookup("series", series))
 
 
-def load_movie_db(movie_path: str):
+REGISTRIES = [InfoDirector, InfoLabel, InfoMaker, InfoSeries, InfoKeyword, InfoActor, MovieCacheLite]
+
+
+def load_movie_db(movie_path: str, use_catalog: bool = False, lazy: bool = False, binary: bool = False):
+    if InfoMovieItem.flusher:
+        InfoMovieItem.flusher.stop()
+        InfoMovieItem.flusher.flush()
+    InfoMovieItem.binary = binary
+    if InfoMovieItem.catalog:
+        InfoMovieItem.catalog.close()
+        InfoMovieItem.catalog = None
+    if use_catalog:
+        InfoMovieItem.catalog = MovieCatalog(join_path(movie_path, MovieCatalog.FILE))
+
     InfoDirector.load(movie_path)
     InfoLabel.load(movie_path)
     InfoMaker.load(movie_path)
@@ -139,18 +278,19 @@ def load_movie_db(movie_path: str):
     InfoActor.load(movie_path)
 
     MovieCacheLite.load(movie_path)
-    MovieCache.load(movie_path)
+    MovieCache.load(movie_path, lazy)
+
+    for r in REGISTRIES:
+        r.saved_generation = r.generation
+    InfoMovieItem.flusher = RegistryFlusher(REGISTRIES)
+    InfoMovieItem.flusher.start()
 
 
 async def save_movie_db():
-    task_list = [
-        asyncio.ensure_future(InfoDirector.async_save()),
-        asyncio.ensure_future(InfoLabel.async_save()),
-        asyncio.ensure_future(InfoMaker.async_save()),
-        asyncio.ensure_future(InfoSeries.async_save()),
-        asyncio.ensure_future(InfoKeyword.async_save()),
-        asyncio.ensure_future(InfoActor.async_save()),
-        asyncio.ensure_future(MovieCacheLite.async_save()),
-        asyncio.ensure_future(MovieCache.async_save()),
-    ]
+    # stop the background writer first so the final flush does not race it
+    if InfoMovieItem.flusher:
+        InfoMovieItem.flusher.stop()
+        InfoMovieItem.flusher = None
+    task_list = [asyncio.ensure_future(r.async_flush()) for r in REGISTRIES]
+    task_list.append(asyncio.ensure_future(MovieCache.async_save()))
     await asyncio.gather(*task_list)
@@ -0,0 +1,228 @@
+import json
+import re
+import sqlite3
+import threading
+from typing import AnyStr, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS movie (
+    mid TEXT PRIMARY KEY,
+    title TEXT,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS movie_actor (
+    actor TEXT NOT NULL,
+    mid TEXT NOT NULL,
+    PRIMARY KEY (actor, mid)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS movie_actor_mid ON movie_actor (mid);
+CREATE TABLE IF NOT EXISTS movie_keyword (
+    keyword TEXT NOT NULL,
+    mid TEXT NOT NULL,
+    PRIMARY KEY (keyword, mid)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS movie_keyword_mid ON movie_keyword (mid);
+CREATE TABLE IF NOT EXISTS registry (
+    file TEXT NOT NULL,
+    name TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (file, name)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS actor_alias (
+    name TEXT PRIMARY KEY,
+    alias TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS actor_alias_suffix (
+    suffix TEXT NOT NULL,
+    name TEXT NOT NULL,
+    PRIMARY KEY (suffix, name)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS actor_alias_suffix_name ON actor_alias_suffix (name);
+"""
+
+ALIAS_SPLIT = re.compile(r"[、,，/／・;；\s()（）]+")
+
+
+class MovieCatalog:
+    """SQLite store for MovieCache and the Info* registries.
+
+    Movies are kept as json rows with side tables for actor and keyword lookups.
+    ``mid_key`` holds the normalized id and is the prefix index for ``startswith``.
+    Registry files are stored as one row per name under their file name, actor
+    aliases are split into tokens and every suffix of a token is indexed, so
+``guess_actor`` finds a part of a token with a prefix range.
+    """
+    FILE = "py_movie.db"
+    ACTOR_FILE = "py_actor.txt"
+
+    def __init__(self, path: AnyStr):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self._upgrade()
+        self.conn.commit()
+
+    def _upgrade(self) -> None:
+        columns = [r[1] for r in self.conn.execute("PRAGMA table_info(movie)")]
+        if "mid_key" not in columns:
+            self.conn.execute("ALTER TABLE movie ADD COLUMN mid_key TEXT")
+            self.conn.executemany("UPDATE movie SET mid_key = ? WHERE mid = ?",
+                                  [(MovieCatalog.normalize(r[0]), r[0])
+                                   for r in self.conn.execute("SELECT mid FROM movie").fetchall()])
+        self.conn.execute("CREATE INDEX IF NOT EXISTS movie_mid_key ON movie (mid_key)")
+        # whole tokens only, superseded by the suffixes
+        self.conn.execute("DROP TABLE IF EXISTS actor_alias_token")
+        if not self.conn.execute("SELECT 1 FROM actor_alias_suffix LIMIT 1").fetchone():
+            for name, alias in self.conn.execute("SELECT name, alias FROM actor_alias").fetchall():
+                self._put_alias_tokens(name, alias)
+
+    @staticmethod
+    def normalize(mid: str) -> str:
+        return mid.strip().upper()
+
+    def close(self) -> None:
+        with self.lock:
+            self.conn.commit()
+            self.conn.close()
+
+    def commit(self) -> None:
+        with self.lock:
+            self.conn.commit()
+
+    # movie
+
+    def movie_count(self) -> int:
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM movie").fetchone()[0]
+
+    def load_movies(self) -> dict[str, dict]:
+        with self.lock:
+            rows = self.conn.execute("SELECT mid, data FROM movie").fetchall()
+        return {mid: json.loads(data) for mid, data in rows}
+
+    def put_movies(self, movies: dict[str, dict]) -> None:
+        with self.lock:
+            for mid, d in movies.items():
+                self._put(mid, d)
+            self.conn.commit()
+
+    def put_movie(self, mid: str, d: dict) -> None:
+        with self.lock:
+            self._put(mid, d)
+            self.conn.commit()
+
+    def remove_movie(self, mid: str) -> None:
+        with self.lock:
+            self._remove(mid)
+            self.conn.commit()
+
+    def _put(self, mid: str, d: dict) -> None:
+        self._remove(mid)
+        self.conn.execute("INSERT INTO movie (mid, mid_key, title, data) VALUES (?, ?, ?, ?)",
+                          (mid, MovieCatalog.normalize(mid), d.get("title"), json.dumps(d, ensure_ascii=False)))
+        if d.get("actors"):
+            self.conn.executemany("INSERT OR IGNORE INTO movie_actor (actor, mid) VALUES (?, ?)",
+                                  [(a, mid) for a in d["actors"]])
+        if d.get("keywords"):
+            self.conn.executemany("INSERT OR IGNORE INTO movie_keyword (keyword, mid) VALUES (?, ?)",
+                                  [(k, mid) for k in d["keywords"]])
+
+    def _remove(self, mid: str) -> None:
+        self.conn.execute("DELETE FROM movie WHERE mid = ?", (mid,))
+        self.conn.execute("DELETE FROM movie_actor WHERE mid = ?", (mid,))
+        self.conn.execute("DELETE FROM movie_keyword WHERE mid = ?", (mid,))
+
+    def mids_by_actor(self, actor: str) -> list[str]:
+        with self.lock:
+            rows = self.conn.execute("SELECT mid FROM movie_actor WHERE actor = ?", (actor,)).fetchall()
+        return [r[0] for r in rows]
+
+    def mids_by_keyword(self, keyword: str) -> list[str]:
+        with self.lock:
+            rows = self.conn.execute("SELECT mid FROM movie_keyword WHERE keyword = ?", (keyword,)).fetchall()
+        return [r[0] for r in rows]
+
+    def count_by_actor(self) -> dict[str, int]:
+        with self.lock:
+            rows = self.conn.execute("SELECT actor, COUNT(*) FROM movie_actor GROUP BY actor").fetchall()
+        return dict(rows)
+
+    def startswith(self, prefix: str) -> dict[str, str]:
+        # range scan on the mid_key index instead of LIKE, which would not use it
+        prefix = MovieCatalog.normalize(prefix)
+        with self.lock:
+            rows = self.conn.execute("SELECT mid, title FROM movie WHERE mid_key >= ? AND mid_key < ?",
+                                     (prefix, prefix + "\U0010ffff")).fetchall()
+        return dict(rows)
+
+    # registry
+
+    def load_registry(self, file: str) -> dict:
+        with self.lock:
+            rows = self.conn.execute("SELECT name, data FROM registry WHERE file = ?", (file,)).fetchall()
+        return {name: json.loads(data) for name, data in rows}
+
+    def save_registry(self, file: str, data: dict) -> None:
+        rows = [(file, name, json.dumps(v, ensure_ascii=False)) for name, v in list(data.items())]
+        with self.lock:
+            self.conn.execute("DELETE FROM registry WHERE file = ?", (file,))
+            self.conn.executemany("INSERT INTO registry (file, name, data) VALUES (?, ?, ?)", rows)
+            if file == MovieCatalog.ACTOR_FILE:
+                self._rebuild_alias(data)
+            self.conn.commit()
+
+    def _rebuild_alias(self, data: dict) -> None:
+        self.conn.execute("DELETE FROM actor_alias")
+        self.conn.execute("DELETE FROM actor_alias_suffix")
+        rows = []
+        for k, v in list(data.items()):
+            alias = MovieCatalog.actor_alias(v)
+            if alias:
+                rows.append((k, alias))
+                self._put_alias_tokens(k, alias)
+        self.conn.executemany("INSERT INTO actor_alias (name, alias) VALUES (?, ?)", rows)
+
+    @staticmethod
+    def alias_tokens(alias: str) -> set[str]:
+        return {t for t in ALIAS_SPLIT.split(alias) if t}
+
+    def _put_alias_tokens(self, name: str, alias: str) -> None:
+        suffixes = {t[i:] for t in MovieCatalog.alias_tokens(alias) for i in range(len(t))}
+        self.conn.executemany("INSERT OR IGNORE INTO actor_alias_suffix (suffix, name) VALUES (?, ?)",
+                              [(s, name) for s in suffixes])
+
+    @staticmethod
+    def actor_alias(v: dict) -> Optional[str]:
+        if "profile" in v and "別名" in v["profile"][1]:
+            return v["profile"][1]["別名"]
+        return None
+
+    def set_alias(self, name: str, alias: Optional[str]) -> None:
+        with self.lock:
+            self.conn.execute("DELETE FROM actor_alias_suffix WHERE name = ?", (name,))
+            if alias:
+                self.conn.execute("INSERT OR REPLACE INTO actor_alias (name, alias) VALUES (?, ?)", (name, alias))
+                self._put_alias_tokens(name, alias)
+            else:
+                self.conn.execute("DELETE FROM actor_alias WHERE name = ?", (name,))
+            self.conn.commit()
+
+    def guess_actor(self, name: str) -> list[str]:
+        """Actors whose alias contains ``name``, the same test as the dict path.
+
+        The suffix index only picks the candidates, aliases with a token
+        containing ``name``. A name that spans separators scans the aliases.
+        """
+        if not name:
+            return []
+        with self.lock:
+            if MovieCatalog.alias_tokens(name) == {name}:
+                rows = self.conn.execute(
+                    "SELECT DISTINCT a.name, a.alias FROM actor_alias_suffix t JOIN actor_alias a ON a.name = t.name "
+                    "WHERE t.suffix >= ? AND t.suffix < ?", (name, name + "\U0010ffff")).fetchall()
+            else:
+                rows = self.conn.execute("SELECT name, alias FROM actor_alias").fetchall()
+        return [n for n, alias in rows if name in alias]
@@ -0,0 +1,171 @@
+import bisect
+import threading
+from typing import Any, Iterable
+
+
+class MovieIndex:
+    """Inverted indexes over MovieCache, updated on every put/remove.
+
+    ``rebuild`` only remembers the data; the tables are filled on the first
+    lookup. A LazyMovieStore hands out the persisted ``summary`` of every movie
+    instead, so a lazily loaded cache is not parsed for the index either.
+    The indexed values of each movie are remembered per movie_id, so a movie
+    edited in place before ``remove`` is still taken out of the right sets.
+
+    ``ids`` is a sorted list of ``(normalized id, movie_id)`` for prefix lookups,
+    built from the keys alone and kept sorted by ``add``/``remove`` afterwards.
+    """
+    PREFIX_END = "\U0010ffff"
+    FIELDS = ("maker", "label", "series")
+
+    def __init__(self):
+        self.actor: dict[str, set[str]] = {}
+        self.keyword: dict[str, set[str]] = {}
+        self.maker: dict[str, set[str]] = {}
+        self.label: dict[str, set[str]] = {}
+        self.series: dict[str, set[str]] = {}
+        self.actor_count: dict[str, int] = {}
+        self.entries: dict[str, tuple] = {}
+        self.ids: list[tuple[str, str]] = []
+        self.ids_dirty = True
+        self.source = None
+        self.built = False
+        self.lock = threading.RLock()
+
+    def clear(self) -> None:
+        self.__init__()
+
+    def rebuild(self, data) -> None:
+        self.clear()
+        self.source = data
+
+    def _ensure(self) -> None:
+        with self.lock:
+            if self.built:
+                return
+            if getattr(self.source, "summary", None):
+                for mid, entry in self.source.summaries().items():
+                    self._index_entry(mid, entry)
+            elif self.source is not None:
+                # a copy, puts from other threads would change the dict under the loop
+                for mid, m in list(self.source.items()):
+                    self._index(mid, m)
+            self.built = True
+
+    @staticmethod
+    def summary(m: Any) -> list:
+        """The indexed values of a movie, json friendly so a store can persist them."""
+        return [list(dict.fromkeys(m.actors or ())),
+                list(dict.fromkeys(m.keywords or ())),
+                [getattr(m, f, None) for f in MovieIndex.FIELDS]]
+
+    def lookup(self, table: str, key: str) -> set[str]:
+        self._ensure()
+        with self.lock:
+            return set(getattr(self, table).get(key, ()))
+
+    def actor_counts(self) -> dict[str, int]:
+        self._ensure()
+        with self.lock:
+            return dict(self.actor_count)
+
+    def add(self, mid: str, m: Any) -> None:
+        with self.lock:
+            if not self.ids_dirty:
+                key = (MovieIndex.normalize(mid), mid)
+                i = bisect.bisect_left(self.ids, key)
+                if i == len(self.ids) or self.ids[i] != key:
+                    self.ids.insert(i, key)
+            if self.built:
+                self._unindex(mid)
+                self._index(mid, m)
+
+    def _index(self, mid: str, m: Any) -> None:
+        self._index_entry(mid, MovieIndex.summary(m))
+
+    def _index_entry(self, mid: str, entry: list) -> None:
+        actors, keywords, fields = (tuple(v) for v in entry)
+        self.entries[mid] = (actors, keywords, fields)
+
+        MovieIndex._add_all(self.actor, actors, mid)
+        MovieIndex._add_all(self.keyword, keywords, mid)
+        for table, value in zip(self._field_tables(), fields):
+            if value:
+                MovieIndex._add_all(table, (value,), mid)
+        for a in actors:
+            self.actor_count[a] = self.actor_count.get(a, 0) + 1
+
+    def remove(self, mid: str) -> None:
+        with self.lock:
+            if not self.ids_dirty:
+                key = (MovieIndex.normalize(mid), mid)
+                i = bisect.bisect_left(self.ids, key)
+                if i < len(self.ids) and self.ids[i] == key:
+                    del self.ids[i]
+            if self.built:
+                self._unindex(mid)
+
+    def _unindex(self, mid: str) -> None:
+        entry = self.entries.pop(mid, None)
+        if entry is None:
+            return
+        actors, keywords, fields = entry
+
+        MovieIndex._remove_all(self.actor, actors, mid)
+        MovieIndex._remove_all(self.keyword, keywords, mid)
+        for table, value in zip(self._field_tables(), fields):
+            if value:
+                MovieIndex._remove_all(table, (value,), mid)
+        for a in actors:
+            count = self.actor_count.get(a, 0) - 1
+            if count > 0:
+                self.actor_count[a] = count
+            else:
+                self.actor_count.pop(a, None)
+
+    @staticmethod
+    def normalize(mid: str) -> str:
+        return mid.strip().upper()
+
+    def _sorted_ids(self) -> list[tuple[str, str]]:
+        if self.ids_dirty:
+            self.ids = sorted((MovieIndex.normalize(mid), mid) for mid in (self.source or ()))
+            self.ids_dirty = False
+        return self.ids
+
+    def startswith(self, prefix: str, limit: int = 0) -> list[str]:
+        prefix = MovieIndex.normalize(prefix)
+        with self.lock:
+            ids = self._sorted_ids()
+            lo = bisect.bisect_left(ids, (prefix,))
+            hi = bisect.bisect_left(ids, (prefix + MovieIndex.PREFIX_END,), lo)
+            if limit > 0:
+                hi = min(hi, lo + limit)
+            return [mid for _, mid in ids[lo:hi]]
+
+    def by_series_prefix(self, series: str) -> list[str]:
+        # "ABP" should not also match "ABPN-001"
+        series = series.strip()
+        if not series.endswith("-"):
+            series += "-"
+        return self.startswith(series)
+
+    def _field_tables(self) -> tuple:
+        return self.maker, self.label, self.series
+
+    @staticmethod
+    def _add_all(table: dict, keys: Iterable, mid: str) -> None:
+        for k in keys:
+            if k in table:
+                table[k].add(mid)
+            else:
+                table[k] = {mid}
+
+    @staticmethod
+    def _remove_all(table: dict, keys: Iterable, mid: str) -> None:
+        for k in keys:
+            s = table.get(k)
+            if s is not None:
+                s.discard(mid)
+                if not s:
+                    table.pop(k)
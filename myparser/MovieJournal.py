@@ -0,0 +1,95 @@
+import json
+import os
+import threading
+from typing import AnyStr, Callable, Any
+
+
+class MovieJournal:
+    """Append-only change log kept next to a snapshot file.
+
+    Every line is one json record, ``["put", key, data]`` or ``["remove", key]``.
+    ``rotate`` moves the current log aside so a snapshot can be written while new
+    changes keep going to a fresh log; ``drop_rotated`` removes it once the
+    snapshot is safely on disk.
+    """
+    SUFFIX = ".log"
+    ROTATED_SUFFIX = ".log.1"
+
+    def __init__(self, snapshot_path: AnyStr):
+        self.path = snapshot_path + MovieJournal.SUFFIX
+        self.rotated_path = snapshot_path + MovieJournal.ROTATED_SUFFIX
+        self.count = 0
+        self.lock = threading.Lock()
+        self.file = None
+
+    def replay(self, data: dict, make: Callable[[dict], Any]) -> int:
+        count = 0
+        # a left over rotated log means the last compaction did not finish
+        for path in (self.rotated_path, self.path):
+            if os.path.exists(path):
+                count += MovieJournal._replay_file(path, data, make)
+        self.count = count
+        return count
+
+    @staticmethod
+    def _replay_file(path: AnyStr, data: dict, make: Callable[[dict], Any]) -> int:
+        count = 0
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except Exception as e:
+                    # torn write at the tail of the log
+                    print(e)
+                    break
+                if record[0] == "put":
+                    data[record[1]] = make(record[2])
+                elif record[0] == "remove":
+                    data.pop(record[1], None)
+                count += 1
+        return count
+
+    def append(self, op: str, key: str, data: dict = None) -> None:
+        record = [op, key] if data is None else [op, key, data]
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self.lock:
+            if self.file is None:
+                self.file = open(self.path, "a", encoding="utf-8")
+            self.file.write(line)
+            self.file.flush()
+            self.count += 1
+
+    def rotate(self) -> bool:
+        with self.lock:
+            self._close()
+            if not os.path.exists(self.path):
+                return os.path.exists(self.rotated_path)
+            if os.path.exists(self.rotated_path):
+                # keep the unfinished generation, the new snapshot covers both
+                with open(self.path, encoding="utf-8") as src, \
+                        open(self.rotated_path, "a", encoding="utf-8") as des:
+                    des.write(src.read())
+                os.remove(self.path)
+            else:
+                os.replace(self.path, self.rotated_path)
+            self.count = 0
+            return True
+
+    def drop_rotated(self) -> None:
+        try:
+            if os.path.exists(self.rotated_path):
+                os.remove(self.rotated_path)
+        except Exception as e:
+            print(e)
+
+    def close(self) -> None:
+        with self.lock:
+            self._close()
+
+    def _close(self) -> None:
+        if self.file is not None:
+            self.file.close()
+            self.file = None
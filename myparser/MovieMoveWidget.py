@@ -47,7 +47,8 @@ class MovieMoveWidget(QWidget):
         dial = EditDictDialog(InfoMaker.mod_dir, self.movie.maker)
         if dial.exec():
             InfoMaker.mod_dir = dial.get_result()
-            InfoMaker.save()
+            InfoMaker.touch()
+            InfoMaker.flush()
             self.maker_path = join_path(self.movie_base, f"({InfoMaker.dir(self.movie.maker)})")
             self.m_m.setText(self.maker_path)
             if os.path.exists(self.maker_path):
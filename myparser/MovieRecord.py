@@ -0,0 +1,104 @@
+from MyCommon import join_path
+from myparser.InfoMovie import InfoMovie
+from myparser.InfoMovieItem import InfoMovieItem
+
+FIELDS = ("movie_id", "path", "back_img_url", "back_img_path", "front_img_url", "front_img_path",
+          "title", "maker", "label", "date", "series", "length", "desc", "director",
+          "actors", "keywords", "movie_files", "link", "version", "custom1", "custom2")
+NAME_FIELDS = ("maker", "label", "series", "director")
+LIST_FIELDS = ("actors", "keywords", "movie_files")
+
+# stands for an image path that is path + the default file name
+_DERIVED = object()
+
+
+class MovieRecord:
+    """Slotted copy of an InfoMovie for keeping in MovieCache.
+
+    Names shared between movies (maker, label, series, director, actors and
+    keywords) are interned through InfoMovieItem so every record points at the
+    same string as the registries. Lists are kept as tuples, image paths that
+    are just ``path`` + the default file name are not stored at all and any
+    unknown attribute goes to ``extra``. Fields the dict did not have read as
+    None and are left out of ``to_dict`` again.
+    """
+    __slots__ = FIELDS + ("extra", "missing")
+
+    @staticmethod
+    def from_dict(d: dict) -> "MovieRecord":
+        r = MovieRecord.__new__(MovieRecord)
+        d = dict(d)
+        r.missing = tuple(f for f in FIELDS if f not in d) or None
+        for f in FIELDS:
+            setattr(r, f, d.pop(f, None))
+        for f in NAME_FIELDS:
+            setattr(r, f, InfoMovieItem._intern(getattr(r, f)))
+        for f in LIST_FIELDS:
+            v = getattr(r, f)
+            if isinstance(v, list):
+                setattr(r, f, tuple(InfoMovieItem._intern(i) for i in v))
+        if r.path and r.back_img_path == join_path(r.path, InfoMovie.BACK_IMG):
+            r.back_img_path = _DERIVED
+        if r.path and r.front_img_path == join_path(r.path, InfoMovie.FRONT_IMG):
+            r.front_img_path = _DERIVED
+        r.extra = d or None
+        return r
+
+    @staticmethod
+    def from_movie(m: InfoMovie) -> "MovieRecord":
+        return MovieRecord.from_dict(m.__dict__)
+
+    def to_dict(self) -> dict:
+        missing = self.missing or ()
+        d = {f: getattr(self, f) for f in FIELDS if f not in missing}
+        for f in LIST_FIELDS:
+            if isinstance(d.get(f), tuple):
+                d[f] = list(d[f])
+        if self.back_img_path is _DERIVED:
+            d["back_img_path"] = join_path(self.path, InfoMovie.BACK_IMG)
+        if self.front_img_path is _DERIVED:
+            d["front_img_path"] = join_path(self.path, InfoMovie.FRONT_IMG)
+        if self.extra:
+            d.update(self.extra)
+        return d
+
+    def to_movie(self) -> InfoMovie:
+        m: InfoMovie = InfoMovie.__new__(InfoMovie)
+        m.__dict__.update(self.to_dict())
+        return m
+
+
+def benchmark(count: int = 50000) -> None:
+    import tracemalloc
+
+    def sample(i: int) -> dict:
+        path = f"D:/AV/Maker {i % 200}/2020-01-01 [ABC-{i:05d}] Title {i}"
+        return {"version": InfoMovie.LATEST, "movie_id": f"ABC-{i:05d}", "path": path,
+                "back_img_url": f"https://example.com/{i}pl.jpg", "back_img_path": join_path(path, "back.jpg"),
+                "front_img_url": f"https://example.com/{i}ps.jpg", "front_img_path": join_path(path, "front.jpg"),
+                "title": f"Title {i}", "maker": f"Maker {i % 200}", "label": f"Label {i % 300}",
+                "date": "2020-01-01", "series": f"Series {i % 2000}", "length": "120",
+                "desc": f"Description {i}", "director": f"Director {i % 100}",
+                "actors": [f"Actor {i % 5000}", f"Actor {(i * 7) % 5000}"],
+                "keywords": [f"Keyword {k}" for k in range(i % 8)],
+                "movie_files": [], "link": "", "custom1": 0, "custom2": 0}
+
+    def make_movie(d: dict) -> InfoMovie:
+        m: InfoMovie = InfoMovie.__new__(InfoMovie)
+        m.__dict__.update(d)
+        return m
+
+    for name, make in (("InfoMovie", make_movie), ("MovieRecord", MovieRecord.from_dict)):
+        tracemalloc.start()
+        # json.load gives every movie its own copy of each string, so do the same here
+        rows = [sample(i) for i in range(count)]
+        cache = {d["movie_id"]: make(d) for d in rows}
+        del rows
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{name:12} {len(cache)} movies {size / 1024 / 1024:8.1f} MB")
+        del cache
+
+
+if __name__ == '__main__':
+    benchmark()
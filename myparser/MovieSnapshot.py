@@ -0,0 +1,123 @@
+import argparse
+import json
+import os
+import pickle
+import struct
+from typing import AnyStr, Callable, Optional
+
+from MyCommon import atomic_write, read_checked, mark_restored, BACKUP_SUFFIX
+
+MAGIC = b"PYMS"
+# magic, format, record schema (InfoMovie.LATEST)
+HEADER = struct.Struct("<4sHH")
+FORMAT = 1
+SUFFIX = ".bin"
+
+# schema version -> function upgrading the data to the next version
+MIGRATIONS: dict[int, Callable[[dict], dict]] = {}
+
+
+class SchemaMismatch(ValueError):
+    """The snapshot holds records of another InfoMovie schema and no migration reaches the current one."""
+
+
+def schema() -> int:
+    from myparser.InfoMovie import InfoMovie
+    return InfoMovie.LATEST
+
+
+def binary_path(path: AnyStr) -> AnyStr:
+    return os.path.splitext(path)[0] + SUFFIX
+
+
+def encode(data: dict) -> bytes:
+    return HEADER.pack(MAGIC, FORMAT, schema()) + pickle.dumps(data, protocol=5)
+
+
+def decode(raw: bytes) -> tuple[dict, int]:
+    magic, fmt, version = HEADER.unpack_from(raw)
+    if magic != MAGIC or fmt != FORMAT:
+        raise ValueError("not a snapshot")
+    return pickle.loads(memoryview(raw)[HEADER.size:]), version
+
+
+def migrate(data: dict, version: int) -> dict:
+    target = schema()
+    while version < target:
+        if version not in MIGRATIONS:
+            raise SchemaMismatch(f"schema {version}, expected {target}")
+        data = MIGRATIONS[version](data)
+        version += 1
+    if version != target:
+        raise SchemaMismatch(f"schema {version}, expected {target}")
+    return data
+
+
+def load(path: AnyStr) -> Optional[dict]:
+    """Data of the snapshot or its backup, None when neither decodes at the current schema."""
+    for p in (path, path + BACKUP_SUFFIX):
+        raw = read_checked(p)
+        if raw is None:
+            continue
+        try:
+            data = migrate(*decode(raw))
+            if p != path:
+                mark_restored(path)
+            return data
+        except Exception as e:
+            print(e)
+    return None
+
+
+def dump(path: AnyStr, data: dict) -> bool:
+    try:
+        raw = encode(data)
+    except Exception as e:
+        print(e)
+        return False
+    return atomic_write(path, raw, checksum=True, backup=True)
+
+
+def newer(path: AnyStr) -> bool:
+    """True when the binary snapshot of ``path`` exists and is not older than the json one."""
+    bin_path = binary_path(path)
+    if not os.path.exists(bin_path):
+        return False
+    return not os.path.exists(path) or os.path.getmtime(bin_path) >= os.path.getmtime(path)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Convert movie db snapshots between json and binary")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("to-binary")
+    p.add_argument("src")
+    p.add_argument("des", nargs="?")
+    p = sub.add_parser("to-json")
+    p.add_argument("src")
+    p.add_argument("des", nargs="?")
+    p = sub.add_parser("info")
+    p.add_argument("src")
+    args = parser.parse_args()
+
+    raw = read_checked(args.src)
+    if raw is None:
+        parser.error(f"cannot read {args.src}, missing or checksum error")
+
+    if args.command == "to-binary":
+        data = json.loads(raw)
+        des = args.des or binary_path(args.src)
+        if dump(des, data):
+            print(f"{len(data)} entries -> {des}")
+    elif args.command == "to-json":
+        data, _ = decode(raw)
+        des = args.des or args.src + ".json"
+        with open(des, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=4)
+        print(f"{len(data)} entries -> {des}")
+    else:
+        data, version = decode(raw)
+        print(f"format {FORMAT} schema {version} entries {len(data)} size {len(raw)}")
+
+
+if __name__ == '__main__':
+    main()
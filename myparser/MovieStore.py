@@ -0,0 +1,275 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from typing import AnyStr, Callable, Any, Iterator, Optional
+
+
+class LazyMovieStore(MutableMapping):
+    """Dict-like view over a line delimited movie snapshot.
+
+    The snapshot holds one ``movie_id<TAB>json`` line per movie and an ``.idx``
+    file with the byte offset of every line, so startup only reads the ids.
+    A movie is parsed on first access and kept in a bounded LRU.
+    Changes since the snapshot live in ``overlay`` and ``removed`` until the
+    next ``write_snapshot``.
+
+    With a ``summary`` function a ``.sum`` file keeps its result for every
+    snapshot line, which ``summaries`` returns without parsing the movies.
+    """
+    FILE = "py_movie.ndjson"
+    INDEX_SUFFIX = ".idx"
+    SUMMARY_SUFFIX = ".sum"
+    CACHE_SIZE = 2000
+
+    def __init__(self, path: AnyStr, make: Callable[[dict], Any], dump: Callable[[Any], dict] = vars,
+                 cache_size: int = CACHE_SIZE, summary: Optional[Callable[[Any], Any]] = None):
+        self.path = path
+        self.index_path = path + LazyMovieStore.INDEX_SUFFIX
+        self.summary_path = path + LazyMovieStore.SUMMARY_SUFFIX
+        self.summary = summary
+        self.make = make
+        self.dump = dump
+        self.cache_size = cache_size
+        self.offsets: dict[str, int] = {}
+        self.overlay: dict[str, Any] = {}
+        self.removed: set[str] = set()
+        self.cache: OrderedDict = OrderedDict()
+        self.lock = threading.RLock()
+        self.file = None
+
+    def open(self) -> None:
+        with self.lock:
+            self._close()
+            if not os.path.exists(self.path):
+                self.offsets = {}
+            elif not self._load_index():
+                print("rebuild index", self.index_path)
+                self._scan()
+                LazyMovieStore._write_index(self.index_path, self.offsets, os.path.getsize(self.path))
+
+    def _load_index(self) -> bool:
+        try:
+            with open(self.index_path, encoding="utf-8") as f:
+                if int(f.readline()) != os.path.getsize(self.path):
+                    return False
+                offsets = {}
+                for line in f:
+                    mid, offset = line.rstrip("\n").split("\t")
+                    offsets[mid] = int(offset)
+                self.offsets = offsets
+                return True
+        except Exception as e:
+            print(e)
+        return False
+
+    def _scan(self) -> None:
+        offsets = {}
+        with open(self.path, "rb") as f:
+            offset = 0
+            for line in f:
+                if line.endswith(b"\n"):
+                    offsets[line.split(b"\t", 1)[0].decode("utf-8")] = offset
+                offset += len(line)
+        self.offsets = offsets
+
+    @staticmethod
+    def _write_index(path: AnyStr, offsets: dict[str, int], size: int) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f"{size}\n")
+            for mid, offset in offsets.items():
+                f.write(f"{mid}\t{offset}\n")
+
+    def _load_summaries(self) -> Optional[dict]:
+        """Summaries of the snapshot lines, None when the file is missing or stale."""
+        try:
+            with open(self.summary_path, encoding="utf-8") as f:
+                if int(f.readline()) != os.path.getsize(self.path):
+                    return None
+                data = {}
+                for line in f:
+                    mid, value = line.rstrip("\n").split("\t", 1)
+                    data[mid] = json.loads(value)
+                return data
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(e)
+        return None
+
+    @staticmethod
+    def _write_summaries(path: AnyStr, data: dict, size: int) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f"{size}\n")
+            for mid, value in data.items():
+                f.write(mid + "\t" + json.dumps(value, ensure_ascii=False) + "\n")
+
+    def summaries(self) -> dict[str, Any]:
+        with self.lock:
+            overlay = dict(self.overlay)
+            removed = set(self.removed)
+            data = self._load_summaries() if os.path.exists(self.path) else {}
+            if data is None:
+                print("rebuild summaries", self.summary_path)
+                data = {}
+                with open(self.path, "rb") as f:
+                    for line in f:
+                        if not line.endswith(b"\n"):
+                            break
+                        mid = line.split(b"\t", 1)[0].decode("utf-8")
+                        data[mid] = self.summary(self.make(LazyMovieStore.decode(line)))
+                LazyMovieStore._write_summaries(self.summary_path, data, os.path.getsize(self.path))
+        result = {mid: v for mid, v in data.items() if mid not in removed and mid not in overlay}
+        for mid, m in overlay.items():
+            result[mid] = self.summary(m)
+        return result
+
+    @staticmethod
+    def encode(mid: str, d: dict) -> bytes:
+        return (mid + "\t" + json.dumps(d, ensure_ascii=False) + "\n").encode("utf-8")
+
+    @staticmethod
+    def decode(line: bytes) -> dict:
+        return json.loads(line.split(b"\t", 1)[1])
+
+    def _read(self, mid: str) -> dict:
+        if self.file is None:
+            self.file = open(self.path, "rb")
+        self.file.seek(self.offsets[mid])
+        return LazyMovieStore.decode(self.file.readline())
+
+    def close(self) -> None:
+        with self.lock:
+            self._close()
+
+    def _close(self) -> None:
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    # mapping
+
+    def __getitem__(self, mid: str) -> Any:
+        with self.lock:
+            if mid in self.overlay:
+                return self.overlay[mid]
+            if mid in self.removed or mid not in self.offsets:
+                raise KeyError(mid)
+            m = self.cache.get(mid)
+            if m is not None:
+                self.cache.move_to_end(mid)
+                return m
+            m = self.make(self._read(mid))
+            self.cache[mid] = m
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+            return m
+
+    def __setitem__(self, mid: str, m: Any) -> None:
+        with self.lock:
+            self.overlay[mid] = m
+            self.removed.discard(mid)
+            self.cache.pop(mid, None)
+
+    def __delitem__(self, mid: str) -> None:
+        with self.lock:
+            if mid not in self:
+                raise KeyError(mid)
+            self.overlay.pop(mid, None)
+            self.cache.pop(mid, None)
+            # also kept for new movies, a snapshot being written may contain them
+            self.removed.add(mid)
+
+    def __contains__(self, mid) -> bool:
+        return mid in self.overlay or (mid in self.offsets and mid not in self.removed)
+
+    def __iter__(self) -> Iterator[str]:
+        with self.lock:
+            keys = [k for k in self.offsets if k not in self.removed and k not in self.overlay]
+            keys.extend(self.overlay)
+        return iter(keys)
+
+    def __len__(self) -> int:
+        with self.lock:
+            return len(self.offsets) - sum(1 for k in self.removed if k in self.offsets) \
+                + sum(1 for k in self.overlay if k not in self.offsets)
+
+    def items(self) -> Iterator[tuple[str, Any]]:
+        # full scan reads the snapshot in file order and leaves the LRU alone
+        with self.lock:
+            overlay = dict(self.overlay)
+            skip = set(self.removed) | set(overlay)
+        if os.path.exists(self.path):
+            with open(self.path, "rb") as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break
+                    mid = line.split(b"\t", 1)[0].decode("utf-8")
+                    if mid not in skip:
+                        yield mid, self.make(LazyMovieStore.decode(line))
+        yield from overlay.items()
+
+    def values(self) -> Iterator[Any]:
+        for _, m in self.items():
+            yield m
+
+    # snapshot
+
+    def snapshot(self) -> tuple[dict, set]:
+        with self.lock:
+            return dict(self.overlay), set(self.removed)
+
+    def write_snapshot(self, snapshot: tuple[dict, set]) -> bool:
+        overlay, removed = snapshot
+        tmp_path = self.path + "_tmp"
+        offsets = {}
+        summaries = {}
+        try:
+            if self.summary:
+                with self.lock:
+                    old_summaries = (self._load_summaries() if os.path.exists(self.path) else None) or {}
+            with open(tmp_path, "wb") as des:
+                if os.path.exists(self.path):
+                    # unchanged movies are copied as raw lines without parsing
+                    with open(self.path, "rb") as src:
+                        for line in src:
+                            if not line.endswith(b"\n"):
+                                break
+                            mid = line.split(b"\t", 1)[0].decode("utf-8")
+                            if mid in overlay or mid in removed:
+                                continue
+                            offsets[mid] = des.tell()
+                            des.write(line)
+                            if self.summary:
+                                summaries[mid] = old_summaries[mid] if mid in old_summaries else \
+                                    self.summary(self.make(LazyMovieStore.decode(line)))
+                for mid, m in overlay.items():
+                    offsets[mid] = des.tell()
+                    des.write(LazyMovieStore.encode(mid, self.dump(m)))
+                    if self.summary:
+                        summaries[mid] = self.summary(m)
+                size = des.tell()
+            LazyMovieStore._write_index(tmp_path + LazyMovieStore.INDEX_SUFFIX, offsets, size)
+            if self.summary:
+                LazyMovieStore._write_summaries(tmp_path + LazyMovieStore.SUMMARY_SUFFIX, summaries, size)
+            with self.lock:
+                self._close()
+                os.replace(tmp_path, self.path)
+                os.replace(tmp_path + LazyMovieStore.INDEX_SUFFIX, self.index_path)
+                if self.summary:
+                    os.replace(tmp_path + LazyMovieStore.SUMMARY_SUFFIX, self.summary_path)
+                self.offsets = offsets
+                # keep anything put again or removed while the snapshot was written
+                self.removed = {k for k in self.removed if k not in removed and k in offsets}
+                for mid, m in overlay.items():
+                    if self.overlay.get(mid) is m:
+                        del self.overlay[mid]
+                        self.cache[mid] = m
+                while len(self.cache) > self.cache_size:
+                    self.cache.popitem(last=False)
+            return True
+        except Exception as e:
+            print(e)
+        return False
+
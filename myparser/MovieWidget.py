@@ -15,7 +15,7 @@ from myqt.CommonDialog import InputDialog
 from myqt.EditDict import EditDictDialog
 from myqt.MyQtCommon import QtHBox, QtVBox, MyButton, fa_icon, QtPasteEdit, QtDialog
 from myqt.MyQtWorker import MyThread
-from myqt.QtImage import MyImageBox
+from myqt.QtImage import MyImageBox, MyImageSource
 from myqt.QtVideo import MyVideoConvert, QtVideoDialog
 
 
@@ -39,6 +39,7 @@ class EditMakerDialog(QtDialog):
         dial = EditDictDialog(InfoLabel.modify, self.t_l.text())
         if dial.exec():
             InfoLabel.modify = dial.get_result()
+            InfoLabel.touch()
             self.t_l.setText(InfoLabel.add(self.t_l.text()))
 
 
@@ -242,6 +243,7 @@ class ActorWidget(QWidget):
                     for i, a in enumerate(m.actors):
                         if a == self.actor:
                             m.actors[i] = new_name
+                    MovieCache.put(m)
 
     @Slot()
     def action_edit_actor(self):
@@ -294,7 +296,7 @@ class ActorWidget(QWidget):
                 profile['身長＆スリーサイズ'] = d
 
             data = InfoActor.get(self.actor, {"profile": [photo, profile]})
-            InfoActor.save()
+            InfoActor.flush()
             self.show_profile(data[1])
 
     @Slot()
@@ -323,6 +325,7 @@ class KeywordWidget(QWidget):
     @Slot()
     def action_hide(self):
         InfoKeyword.FILTER.append(self.keyword)
+        InfoKeyword.touch()
 
     @Slot()
     def action_list_movie(self):
@@ -490,17 +493,15 @@ class MovieWidget(QFrame):
         but_open.setFixedWidth(90)
         h_box_series = QtHBox().addAll(self.txt_series, self.but_edit_actor, but_open)
 
+        self.back_source = None
         if loaded_b:
             self.cover = MyImageBox(self, image=loaded_b)
         else:
-            try:
-                if movie.back_img_path:
-                    self.cover = MyImageBox.from_path(self, movie.back_img_path, asyn=True)
-                else:
-                    self.cover = MyImageBox.from_path(self, movie.back_img_url, asyn=True)
-            except Exception as e:
-                print(e)
-                self.cover = None
+            # the back image is large, it is only loaded once the widget is shown
+            self.back_source = movie.back_img_path or movie.back_img_url
+            self.cover = MyImageBox(self) if self.back_source else None
+            if self.cover and not movie.back_img_path:
+                self.cover.on_image.connect(self.on_back_image)
 
         if loaded_f:
             self.thumb = MyImageBox(self, image=loaded_f)
@@ -510,6 +511,8 @@ class MovieWidget(QFrame):
                     self.thumb = MyImageBox.from_path(self, movie.front_img_path, QSize(147, 200), asyn=True)
                 else:
                     self.thumb = MyImageBox.from_path(self, movie.front_img_url, QSize(147, 200), asyn=True)
+                    if self.thumb:
+                        self.thumb.on_image.connect(self.on_front_image)
             except Exception as e:
                 print(e)
                 self.thumb = None
@@ -627,6 +630,27 @@ class MovieWidget(QFrame):
 
         self.setLayout(v_box2)
 
+    @staticmethod
+    def image_failed(image: MyImageSource) -> bool:
+        return image.data is None and image.pixmap is None and (image.image is None or image.image.isNull())
+
+    @Slot(MyImageSource)
+    def on_front_image(self, image: MyImageSource):
+        # an image url that does not load is not saved with the movie
+        if self.image_failed(image) and image.image_path == self.movie.front_img_url:
+            self.movie.front_img_url = None
+
+    @Slot(MyImageSource)
+    def on_back_image(self, image: MyImageSource):
+        if self.image_failed(image) and image.image_path == self.movie.back_img_url:
+            self.movie.back_img_url = None
+
+    def showEvent(self, event) -> None:
+        if self.back_source:
+            self.cover.set_path_async(self.back_source)
+            self.back_source = None
+        super().showEvent(event)
+
     @Slot()
     def action_maker_click(self, maker):
         if InfoMaker.movie_base != "" and maker != "":
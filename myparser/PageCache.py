@@ -0,0 +1,147 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import AnyStr, Optional
+from urllib.parse import urlsplit
+
+from MyCommon import atomic_write, DiskLru
+
+
+class PageCache:
+    """Size bounded on-disk cache for the html ParserCommon fetches.
+
+    One ``<sha1>.page`` file per url holds a json line with the validators
+    (ETag / Last-Modified) and the time it was stored, followed by the body.
+    Within the host's ttl a page is served from disk; after that it is
+    revalidated with If-None-Match / If-Modified-Since, and a 304 renews it.
+    The least recently used pages are dropped once the folder is over
+    ``store.max_bytes``.
+
+    Only pages a parser marks as cacheable go through here: the searches,
+    movie details, actor profiles and cosplay galleries. The caller passes a
+    marker (``expect``) its page always contains, so a challenge or login
+    page served in its place is never stored.
+    """
+    DIR = os.path.join(os.path.expanduser("~"), ".cache", "soft.jp", "Manager", "html")
+    SUFFIX = ".page"
+    KEY_HEADERS = ("Cookie", "Accept-Language")
+
+    enabled = True
+    ttl = 3600
+    host_ttl: dict[str, int] = {}
+
+    store = DiskLru(DIR, SUFFIX, 256 * 1024 * 1024)
+    counters = {"hit": 0, "stale": 0, "revalidated": 0, "miss": 0, "store": 0, "unexpected": 0}
+    lock = threading.Lock()
+
+    @staticmethod
+    def key(url: AnyStr, headers: Optional[dict] = None) -> str:
+        parts = [url]
+        if headers:
+            parts.extend(f"{h}:{headers[h]}" for h in PageCache.KEY_HEADERS if h in headers)
+        return hashlib.sha1("\n".join(parts).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def ttl_of(url: AnyStr) -> int:
+        return PageCache.host_ttl.get(urlsplit(url).netloc, PageCache.ttl)
+
+    @staticmethod
+    def _read(key: str) -> Optional[tuple[dict, bytes]]:
+        try:
+            with open(PageCache.store.path(key), "rb") as f:
+                meta = json.loads(f.readline())
+                return meta, f.read()
+        except Exception as e:
+            print(e)
+        return None
+
+    @staticmethod
+    def lookup(url: AnyStr, headers: Optional[dict] = None,
+               expect: Optional[bytes] = None) -> tuple[Optional[bytes], dict]:
+        """``(body, {})`` when a fresh copy is cached, otherwise ``(None, conditional headers)``."""
+        if not PageCache.enabled or not expect:
+            return None, {}
+        key = PageCache.key(url, headers)
+        entry = PageCache._read(key) if key in PageCache.store else None
+        if entry is None:
+            PageCache.store.drop(key)
+            with PageCache.lock:
+                PageCache.counters["miss"] += 1
+            return None, {}
+        meta, body = entry
+        if time.time() - meta.get("stored", 0) < PageCache.ttl_of(url):
+            PageCache.store.touch(key)
+            with PageCache.lock:
+                PageCache.counters["hit"] += 1
+            return body, {}
+        with PageCache.lock:
+            PageCache.counters["stale"] += 1
+        cond = {}
+        if meta.get("etag"):
+            cond["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            cond["If-Modified-Since"] = meta["last_modified"]
+        return None, cond
+
+    @staticmethod
+    def update(url: AnyStr, status: int, response_headers, body: bytes, headers: Optional[dict] = None,
+               expect: Optional[bytes] = None) -> bytes:
+        """Store a 200, renew on 304 and return the body the caller should use."""
+        if not PageCache.enabled or not expect:
+            return body
+        key = PageCache.key(url, headers)
+        if status == 304:
+            entry = PageCache._read(key)
+            if entry is not None:
+                meta, cached = entry
+                meta["stored"] = time.time()
+                PageCache._write(key, meta, cached)
+                with PageCache.lock:
+                    PageCache.counters["revalidated"] += 1
+                return cached
+            return body
+        if status != 200 or "no-store" in response_headers.get("Cache-Control", ""):
+            return body
+        if expect not in body:
+            with PageCache.lock:
+                PageCache.counters["unexpected"] += 1
+            return body
+        meta = {"url": url, "stored": time.time(),
+                "etag": response_headers.get("ETag"), "last_modified": response_headers.get("Last-Modified")}
+        PageCache._write(key, meta, body)
+        return body
+
+    @staticmethod
+    def _write(key: str, meta: dict, body: bytes) -> None:
+        data = json.dumps(meta).encode("utf-8") + b"\n" + body
+        os.makedirs(PageCache.store.folder, exist_ok=True)
+        if not atomic_write(PageCache.store.path(key), data):
+            return
+        PageCache.store.add(key, len(data))
+        with PageCache.lock:
+            PageCache.counters["store"] += 1
+
+    @staticmethod
+    def stats() -> dict:
+        with PageCache.lock:
+            s = dict(PageCache.counters)
+        s["evict"] = PageCache.store.evicted
+        s["entries"] = len(PageCache.store)
+        s["bytes"] = PageCache.store.total
+        return s
+
+    @staticmethod
+    def configure_from(settings) -> None:
+        PageCache.enabled = settings.valueInt("http/cache", 1) == 1
+        PageCache.ttl = settings.valueInt("http/cache_ttl", PageCache.ttl)
+        PageCache.store.set_folder(settings.valueStr("http/cache_dir", PageCache.DIR) or PageCache.DIR)
+        PageCache.store.max_bytes = settings.valueInt("http/cache_mb", PageCache.store.max_bytes >> 20) << 20
+        # "www.javbus.com=86400;www.dmm.co.jp=600"
+        host_ttl = {}
+        for item in settings.valueStr("http/cache_hosts", "").split(";"):
+            host, _, ttl = item.partition("=")
+            if host.strip() and ttl.strip().isdigit():
+                host_ttl[host.strip()] = int(ttl)
+        PageCache.host_ttl = host_ttl
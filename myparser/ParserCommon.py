@@ -1,18 +1,18 @@
 import asyncio
 from typing import Optional
 
+import aiohttp
 import chardet as chardet
 from requests import Response
 # requests-html
 from requests_html import HTMLSession
-import requests
 from bs4 import BeautifulSoup
-from urllib.parse import urlsplit
 
 from cffi.backend_ctypes import unicode
 
-from MyCommon import get_cookie, get_agent
+import MyHttp
 from TextOut import TextOut
+from myparser.PageCache import PageCache
 
 """
 jar.set("csrftoken", "41nDB6kf4Wg04Yq2mwDXKmElDpdTHOj1LQhUHZuD0DJCyadR8klQCXjsL5ZHLVNd", domain='nhentai.net', path='/')
@@ -23,6 +23,9 @@ jar.set("cf_chl_rc_ni", "2", domain='.nhentai.net', path='/')
 jar.set("ts_uid", "2e6b2b11-31ca-417f-90de-b41288d8f174", domain='.tsyndicate.com', path='/')
 """
 
+# pages asked for again while the first fetch is still running wait for it
+page_flight = MyHttp.SingleFlight()
+
 
 def get_html_js(url):
     TextOut.out(f"Load Html: {url}")
@@ -32,24 +35,53 @@ def get_html_js(url):
     print(r.html.html)
 
 
-def get_html(url, timeout=None):
+def page_key(url, expect=None) -> str:
+    # a cached and an uncached fetch of the same url are not shared
+    if expect is None:
+        return url
+    return f"{url}\n{expect!r}"
+
+
+def get_html(url, timeout=None, expect=None):
     out = f"Load Html: {url}"
     if len(out) > 150:
         out = out[:150]
     TextOut.out(out)
-    base_url = "{0.scheme}://{0.netloc}/".format(urlsplit(url))
-    headers = {
-        'Referer': base_url,
-        'User-Agent': get_agent()
-    }
+    return page_flight.do(page_key(url, expect), _fetch_html, url, timeout, expect)
+
+
+def _fetch_html(url, timeout, expect=None):
+    """``expect`` marks a cacheable page, a marker its body always contains."""
+    vary = MyHttp.host_headers(url)
+    body, cond = PageCache.lookup(url, vary, expect)
+    if body is not None:
+        return body
     if timeout is None:
-        timeout = (6.0, 12.0)
-    return requests.get(url, headers=headers, cookies=get_cookie(url), timeout=timeout, verify=False).content
+        timeout = MyHttp.TIMEOUT
+    r = MyHttp.get(url, headers=cond or None, timeout=timeout, verify=False)
+    return PageCache.update(url, r.status_code, r.headers, r.content, vary, expect)
+
+
+async def get_html_async(loop, url, timeout=None, expect=None):
+    out = f"Load Html: {url}"
+    if len(out) > 150:
+        out = out[:150]
+    TextOut.out(out)
+    return await page_flight.async_do(page_key(url, expect), _async_fetch_html, url, timeout, expect)
 
 
-async def get_html_async(loop, url, timeout=None):
-    result = await loop.run_in_executor(None, lambda: get_html(url, timeout))
-    return result
+async def _async_fetch_html(url, timeout, expect=None):
+    vary = MyHttp.host_headers(url)
+    body, cond = PageCache.lookup(url, vary, expect)
+    if body is not None:
+        return body
+    kwargs = {}
+    if isinstance(timeout, tuple):
+        kwargs["timeout"] = aiohttp.ClientTimeout(total=None, connect=timeout[0], sock_read=timeout[1])
+    elif timeout is not None:
+        kwargs["timeout"] = aiohttp.ClientTimeout(total=timeout)
+    async with MyHttp.async_request("GET", url, headers=cond or None, **kwargs) as r:
+        return PageCache.update(url, r.status, r.headers, await r.read(), vary, expect)
 
 
 def get_soup_from_text(text, encode=None) -> BeautifulSoup:
@@ -58,14 +90,18 @@ def get_soup_from_text(text, encode=None) -> BeautifulSoup:
     return BeautifulSoup(text, "lxml")
 
 
-async def get_soup_async(loop, url, encode=None):
-    result = await loop.run_in_executor(None, lambda: get_soup(url, encode))
-    return result
+async def get_soup_async(loop, url, encode=None, timeout=None, expect=None):
+    try:
+        content = await get_html_async(loop, url, timeout, expect)
+    except Exception as e:
+        print(e)
+        return None
+    return get_soup_from_text(content, encode)
 
 
-def get_soup(url, encode=None, timeout=None):
+def get_soup(url, encode=None, timeout=None, expect=None):
     try:
-        content = get_html(url, timeout)
+        content = get_html(url, timeout, expect)
     except Exception as e:
         print(e)
         return None
@@ -4,7 +4,7 @@ from typing import Callable, AnyStr, Optional
 
 from PySide6.QtCore import *
 
-from MyCommon import valid_folder_name, join_path, chunks, download_retry
+from MyCommon import valid_folder_name, join_path, chunks, download_retry, RetryPolicy
 from myparser import ParserCommon
 from myparser.InfoImage import InfoImage
 from myparser.cosplay.base import CosplayParserBase
@@ -18,13 +18,12 @@ __all__ = ["CosplayParserBase",
 retry = 5
 
 
-def get_soup(url, encode=None):
-    return ParserCommon.get_soup(url, encode)
+def get_soup(url, encode=None, expect=None):
+    return ParserCommon.get_soup(url, encode, expect=expect)
 
 
-async def get_soup_async(loop, url, encode=None):
-    result = await loop.run_in_executor(None, lambda: ParserCommon.get_soup(url, encode))
-    return result
+async def get_soup_async(loop, url, encode=None, expect=None):
+    return await ParserCommon.get_soup_async(loop, url, encode, expect=expect)
 
 
 def get_image_data(soup, tag):
@@ -90,15 +89,18 @@ async def process_image_list(loop, url,
         InfoImage.save_info(out_path, info)
 
         job_list = []
+        policy = RetryPolicy.for_job(re, len(image_list))
 
         for i, url in enumerate(image_list):
             if url[-3:] == "png":
-                job_list.append(download_retry([loop, url, "", '{}/{:04}.png'.format(out_path, i), re, base_url]))
+                job_list.append(download_retry([loop, url, "", '{}/{:04}.png'.format(out_path, i), re, base_url,
+                                                policy]))
             else:
-                job_list.append(download_retry([loop, url, "", '{}/{:04}.jpg'.format(out_path, i), re, base_url]))
+                job_list.append(download_retry([loop, url, "", '{}/{:04}.jpg'.format(out_path, i), re, base_url,
+                                                policy]))
 
         if folder_image:
-            job_list.append(download_retry([loop, folder_image, "", f"{out_path}/folder.jpg", re]))
+            job_list.append(download_retry([loop, folder_image, "", f"{out_path}/folder.jpg", re, None, policy]))
 
         await asyncio.gather(*job_list)
 
@@ -11,7 +11,7 @@ class ParseAsiaPretty(CosplayParserBase):
               use_path,
               check_cancel: Callable[[], bool] = None):
 
-        soup = get_soup(url)
+        soup = get_soup(url, expect=b"entry-inner")
 
         folder = get_folder_name(soup, "h1")
         if folder is None:
@@ -37,7 +37,7 @@ class ParseAsiaPretty(CosplayParserBase):
         for i in range(2, page_count):
             page_url = f"{url}{i}/"
             print(page_url)
-            soup = get_soup(page_url)
+            soup = get_soup(page_url, expect=b"entry-inner")
             image_element = soup.select_one("div.entry-inner")
             image_list.extend(get_image_data(image_element, ["img", None, "src"]))
 
@@ -17,7 +17,7 @@ class ParseEyecoser(CosplayParserBase):
     async def parse_async(loop, url,
                           use_path,
                           check_cancel: Callable[[], bool] = None):
-        soup = get_soup(url)
+        soup = get_soup(url, expect=b"wp-block-image")
 
         folder = get_folder_name(soup, "span[class=current]")
         if folder is None:
@@ -22,7 +22,7 @@ class Parse162(CosplayParserBase):
                           check_cancel: Callable[[], bool] = None):
 
         if url.find("category") >= 0:
-            soup = get_soup(url)
+            soup = get_soup(url, expect=b"entry-title")
             cat_element = soup.select("h2[class=entry-title]")
             print(len(cat_element))
             f = []
@@ -42,7 +42,7 @@ class Parse162(CosplayParserBase):
                            mode: int,
                            check_cancel: Callable[[], bool] = None):
 
-        soup = await get_soup_async(loop, url)
+        soup = await get_soup_async(loop, url, expect=b"spotlight")
 
         folder = get_folder_name(soup, "span[class=post-title]")
         if folder is None:
@@ -68,7 +68,7 @@ class Parse162(CosplayParserBase):
 
         image_list = get_image_data(soup, ["div[class^=spotlight]", None, "data-src"])
         for p in page_list:
-            p_soup = await get_soup_async(loop, p)
+            p_soup = await get_soup_async(loop, p, expect=b"spotlight")
             image_list.extend(get_image_data(p_soup, ["div[class^=spotlight]", None, "data-src"]))
 
         image_list = [f"{Parse162.tag}{i}" for i in image_list]
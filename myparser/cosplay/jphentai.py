@@ -18,7 +18,7 @@ class ParseJpHentai1(CosplayParserBase):
     async def parse_async(loop, url,
                           use_path,
                           check_cancel: Callable[[], bool] = None):
-        soup = get_soup(url)
+        soup = get_soup(url, expect=b"icon-overlay")
 
         folder = get_folder_name(soup, "h2")
         if folder is None:
@@ -44,7 +44,7 @@ class ParseJpHentai1(CosplayParserBase):
         for i in range(2, page_count + 1):
             page_url = f"{url}page/{i}/"
             print(page_url)
-            soup = await get_soup_async(loop, page_url)
+            soup = await get_soup_async(loop, page_url, expect=b"icon-overlay")
             image_list += get_image_data(soup, ["div[class=icon-overlay]", "img", "src"])
         image_list = [i.replace("/p=700", "") for i in image_list]
 
@@ -19,7 +19,7 @@ class ParseNhentai(CosplayParserBase):
                           use_path,
                           check_cancel: Callable[[], bool] = None):
 
-        soup = get_soup(url)
+        soup = get_soup(url, expect=b"lazyload")
 
         print(soup)
 
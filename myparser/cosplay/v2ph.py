@@ -18,7 +18,7 @@ class ParseV2ph(CosplayParserBase):
                           use_path,
                           check_cancel: Callable[[], bool] = None):
 
-        soup = get_soup(url)
+        soup = get_soup(url, expect=b"album-photo")
 
         folder = get_folder_name(soup, "h1.h5")
         if folder is None:
@@ -50,7 +50,7 @@ class ParseV2ph(CosplayParserBase):
         for i in range(2, page_count + 1):
             page_url = f"{url}?page={i}"
             print(page_url)
-            soup = await get_soup_async(loop, page_url)
+            soup = await get_soup_async(loop, page_url, expect=b"album-photo")
             image_list.extend(get_image_data(soup, ["div.album-photo", "img", "data-src"]))
 
         # print(image_list)
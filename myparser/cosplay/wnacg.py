@@ -7,14 +7,14 @@ from myqt.MyQtWorker import MyThreadPool
 
 
 async def convert_wnacg_page_to_img(loop, url, iid) -> list:
-    soup = await get_soup_async(loop, url)
+    soup = await get_soup_async(loop, url, expect=b"posselect")
     retry = 0
     while not soup:
         if retry > 5:
             return []
         else:
             retry = retry + 1
-        soup = await get_soup_async(loop, url)
+        soup = await get_soup_async(loop, url, expect=b"posselect")
 
     return ["https:" + get_image_data(soup, ["div[class=posselect]", "img", "src"])[0], iid]
 
@@ -35,7 +35,7 @@ class ParseWnacg(CosplayParserBase):
 
         base_url = "{0.scheme}://{0.netloc}/".format(urlsplit(url))
 
-        soup = get_soup(url)
+        soup = get_soup(url, expect=b"pic_box tb")
 
         folder = get_folder_name(soup, "h2")
         print(folder)
@@ -55,7 +55,7 @@ class ParseWnacg(CosplayParserBase):
             page_element = soup.select_one('span:-soup-contains("後頁")')
             if page_element:
                 next_url = page_element.find("a").attrs['href']
-                soup = get_soup(base_url + next_url)
+                soup = get_soup(base_url + next_url, expect=b"pic_box tb")
             else:
                 has_next = False
 
@@ -18,7 +18,7 @@ class ParseXiannvtu(CosplayParserBase):
                           use_path,
                           check_cancel: Callable[[], bool] = None):
 
-        soup = get_soup(url, "utf-8")
+        soup = get_soup(url, "utf-8", expect=b"picbox")
 
         folder = get_folder_name(soup, "h2")
         if folder is None:
@@ -17,7 +17,7 @@ class ParseXinmeitulu(CosplayParserBase):
     async def parse_async(loop, url,
                           use_path,
                           check_cancel: Callable[[], bool] = None):
-        soup = get_soup(url)
+        soup = get_soup(url, expect=b'class="figure')
 
         folder = get_folder_name(soup, "h1[class=h3]", zh=True)
         if folder is None:
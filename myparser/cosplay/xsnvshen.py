@@ -12,7 +12,7 @@ class ParseXsnvshen(CosplayParserBase):
               use_path,
               check_cancel: Callable[[], bool] = None):
 
-        soup = get_soup(url, "utf-8")
+        soup = get_soup(url, "utf-8", expect=b"origin_image")
 
         folder = get_folder_name(soup, "h1")
         if folder is None:
@@ -1,5 +1,6 @@
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
-from typing import Optional
+from typing import Optional, Callable, Iterable
 from urllib.parse import urlparse
 
 import bs4
@@ -61,6 +62,38 @@ def find_span_as_pair(element: bs4.element.Tag, text: str, p_name: str):
     return None, {}
 
 
+DETAIL_WORKERS = 8
+
+
+def map_ordered(func: Callable, items: Iterable, workers: int = DETAIL_WORKERS, cancel=None) -> list:
+    """Call func for every item on a bounded thread pool.
+
+    Used for the detail page of every search hit, so a search costs about one
+    round-trip instead of one per hit. Falsy results are dropped.
+
+    :param func: Called with one item.
+    :param items: Items, the results keep their order.
+    :param workers: Max concurrent calls.
+    :param cancel: Anything with isInterruptionRequested(), items not started yet are skipped once it is set.
+    :return: Results
+    """
+    items = list(items)
+    if cancel is not None:
+        call = func
+
+        def func(item):
+            if cancel.isInterruptionRequested():
+                return None
+            return call(item)
+
+    if len(items) < 2:
+        results = map(func, items)
+    else:
+        with ThreadPoolExecutor(max_workers=min(workers, len(items)), thread_name_prefix="detail") as executor:
+            results = list(executor.map(func, items))
+    return [r for r in results if r]
+
+
 def url_to_id(url) -> str:
     try:
         p = urlparse(url)
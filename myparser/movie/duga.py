@@ -4,12 +4,12 @@ from urllib.parse import urlparse
 
 from myparser import get_soup
 from myparser.InfoMovie import InfoMovie
-from myparser.movie import select_one_text, select_one_attr
+from myparser.movie import select_one_text, select_one_attr, map_ordered
 
 root = "https://duga.jp"
 
 
-def search_movie(path, keyword) -> list:
+def search_movie(path, keyword, cancel=None) -> list:
     if not keyword:
         return []
 
@@ -18,13 +18,10 @@ def search_movie(path, keyword) -> list:
     print(s_url)
 
     result = []
-    soup = get_soup(s_url)
+    soup = get_soup(s_url, expect=b"contentslist")
     if soup:
         elements = soup.select("div[class=contentslist]")
-        for e in elements:
-            movie = search_single(path, keyword, e)
-            if movie:
-                result.append(movie)
+        result = map_ordered(lambda e: search_single(path, keyword, e), elements, cancel=cancel)
 
     return result
 
@@ -33,7 +30,7 @@ def search_single(path, keyword, element) -> Optional[InfoMovie]:
     detail_url = element.select_one("a")
     if detail_url:
         detail_url = "https://duga.jp" + detail_url.attrs['href']
-        soup = get_soup(detail_url)
+        soup = get_soup(detail_url, expect=b'itemprop="releaseDate"')
 
         title = select_one_text(soup, "h1[class=title]")
 
@@ -1,23 +1,25 @@
 import re
 from typing import Optional
 
-import requests
+import MyHttp
 
 from myparser import get_soup_from_text, get_soup
 from myparser.InfoMovie import InfoMovie, InfoDirector, InfoSeries, InfoMaker, InfoActor, InfoKeyword
+from myparser.movie import map_ordered
 
 
-def search_movie(path, keyword: str) -> list:
+def search_movie(path, keyword: str, cancel=None) -> list:
     if not keyword:
         return []
 
     keyword = keyword.replace("_", " ")
-    response = requests.post('https://www.eiten.tv/product/product_search.php', data={'kw': keyword})
+    response = MyHttp.post('https://www.eiten.tv/product/product_search.php', data={'kw': keyword})
 
     result = []
     soup = get_soup_from_text(response.text)
     if soup:
         elements = soup.select("div[class=products]")
+        details = []
         for e in elements:
             url = e.select_one("a")
             if url:
@@ -25,9 +27,8 @@ def search_movie(path, keyword: str) -> list:
                 front = url.select_one('img')
                 if front:
                     front = front.attrs['data-original']
-                movie = search_single(path, front, d_url)
-                if movie:
-                    result.append(movie)
+                details.append((front, d_url))
+        result = map_ordered(lambda d: search_single(path, *d), details, cancel=cancel)
 
     print("Search End")
 
@@ -35,7 +36,7 @@ def search_movie(path, keyword: str) -> list:
 
 
 def search_single(path, front, detail_url) -> Optional[InfoMovie]:
-    soup = get_soup(detail_url)
+    soup = get_soup(detail_url, expect=b'id="jacket"')
     # <li>■タイトル：
     title = soup.select_one('li:-soup-contains("タイトル")')
     if title:
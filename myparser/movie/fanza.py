@@ -1,7 +1,9 @@
+import asyncio
 import json
 import os.path
 import re
 import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
 
 from PySide6.QtCore import QThread, Signal
 
@@ -12,12 +14,15 @@ from myparser.MovieCache import MovieCache
 from myparser.MovieNameFix import movie_name_fix
 from myparser.ParserCommon import get_html
 from myqt.MyQtWorker import MyThreadPool
-from myqt.QtImage import MyImageSource
 
 api_id = "cKLxQzpehtWUh0bpBvTZ"
 affiliate_id = "joyusexy-990"
 service = ["mono", "digital", "rental"]
 
+SCAN_LOAD_LIMIT = 32
+# every search goes to api.dmm.com, this is the limit for that host
+SCAN_FETCH_LIMIT = 4
+
 
 def get_all_fanza(paths, progress_reset_signal, progress_signal,
                   thread: QThread = None, force=False):
@@ -28,40 +33,90 @@ async def get_all_fanza_run(loop, paths, progress_reset_signal, progress_signal,
                             thread: QThread = None, force=False):
     progress_reset_signal.emit(len(paths))
     progress = 0
-    for p in paths:
+    loaded: list[InfoMovie] = []
+    fetch_limit = asyncio.Semaphore(SCAN_FETCH_LIMIT)
+    executor = ThreadPoolExecutor(SCAN_FETCH_LIMIT, thread_name_prefix="FanzaScan")
+
+    def step():
+        nonlocal progress
         progress += 1
         progress_signal.emit(progress)
+
+    def cancelled() -> bool:
+        return thread is not None and thread.isInterruptionRequested()
+
+    async def scan(p):
         if not force and os.path.exists(os.path.join(p, InfoMovie.FILE)):
             m = await load_info(p)
+            # a broken info.txt is skipped like before
             if m:
-                MovieCache.put(m)
-                if m.actors:
-                    for a in m.actors:
-                        InfoActor.add(a)
-                if m.keywords:
-                    for g in m.keywords:
-                        InfoKeyword.add(g)
-                if m.director:
-                    InfoDirector.add(m.director)
-                if m.maker:
-                    InfoMaker.add(m.maker)
-                if m.label:
-                    InfoLabel.add(m.label)
-                if m.series:
-                    InfoSeries.add(m.series)
-
-            continue
+                loaded.append(m)
+            step()
+            return
         key = file_name_to_movie_id(p)
         if key:
-            TextOut.out(f"Search For {key}...")
-            print(p)
-            try:
-                m = get_fanza_result(p, key, thread, single_mode=True)
-                if len(m):
-                    TextOut.out(f"Save: {p} : {m[0][0].title}")
-                    m[0][0].save()
-            except Exception as e:
-                TextOut.out(str(e))
+            async with fetch_limit:
+                # the wait for a slot can be long, do not start a search after a cancel
+                if cancelled():
+                    return
+                TextOut.out(f"Search For {key}...")
+                print(p)
+                try:
+                    await loop.run_in_executor(executor, fetch_fanza_result, p, key, thread)
+                except Exception as e:
+                    TextOut.out(str(e))
+        step()
+
+    async def worker():
+        for p in pending:
+            if cancelled():
+                return
+            await scan(p)
+
+    # SCAN_LOAD_LIMIT workers share the paths, instead of a coroutine per folder
+    pending = iter(paths)
+    try:
+        await asyncio.gather(*[worker() for _ in range(min(SCAN_LOAD_LIMIT, len(paths)))])
+    finally:
+        executor.shutdown(wait=True)
+    update_registry(loaded)
+
+
+def fetch_fanza_result(path, key, thread) -> None:
+    m = get_fanza_result(path, key, thread, single_mode=True)
+    if len(m):
+        TextOut.out(f"Save: {path} : {m[0][0].title}")
+        m[0][0].save()
+
+
+def update_registry(movies: list[InfoMovie]) -> None:
+    actors, keywords, directors, makers, labels, series = {}, {}, {}, {}, {}, {}
+    for m in movies:
+        MovieCache.put(m)
+        if m.actors:
+            actors.update(dict.fromkeys(m.actors))
+        if m.keywords:
+            keywords.update(dict.fromkeys(m.keywords))
+        if m.director:
+            directors[m.director] = None
+        if m.maker:
+            makers[m.maker] = None
+        if m.label:
+            labels[m.label] = None
+        if m.series:
+            series[m.series] = None
+    for a in actors:
+        InfoActor.add(a)
+    for g in keywords:
+        InfoKeyword.add(g)
+    for d in directors:
+        InfoDirector.add(d)
+    for m in makers:
+        InfoMaker.add(m)
+    for la in labels:
+        InfoLabel.add(la)
+    for s in series:
+        InfoSeries.add(s)
 
 
 def get_fanza_result(path, keyword, thread, single_mode=False) -> list:
@@ -77,42 +132,8 @@ def get_fanza_result(path, keyword, thread, single_mode=False) -> list:
         return []
 
     if len(out):
-        hits = []
-        result = []
-        for m in out:
-            if m.movie_id == keyword:
-                hits.append(m)
-        if hits:
-            for m in hits:
-                f = None
-                b = None
-                if m.front_img_url:
-                    f = MyImageSource(m.front_img_url, q_pix=False)
-                    if f.data is None:
-                        m.front_img_url = None
-                        f = None
-                if m.back_img_url:
-                    b = MyImageSource(m.back_img_url, q_pix=False)
-                    if b.data is None:
-                        m.back_img_url = None
-                        b = None
-                result.append((m, f, b))
-        else:
-            for m in out:
-                f = None
-                b = None
-                if m.front_img_url:
-                    f = MyImageSource(m.front_img_url, q_pix=False)
-                    if f.data is None:
-                        m.front_img_url = None
-                        f = None
-                if m.back_img_url:
-                    b = MyImageSource(m.back_img_url, q_pix=False)
-                    if b.data is None:
-                        m.back_img_url = None
-                        b = None
-                result.append((m, f, b))
-        return result
+        hits = [m for m in out if m.movie_id == keyword]
+        return [(m, None, None) for m in hits or out]
     return []
 
 
@@ -129,7 +150,7 @@ def search_movie(path, keyword, thread: QThread, single_mode=False) -> list[Info
     for s in service:
         param['service'] = s
         url = f"https://api.dmm.com/affiliate/v3/ItemList?{urllib.parse.urlencode(param)}"
-        result = json.loads(get_html(url))['result']
+        result = json.loads(get_html(url, expect=b'"result_count"'))['result']
         if result['status'] == 200 and result['result_count']:
             print(result['result_count'])
 
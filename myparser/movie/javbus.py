@@ -6,7 +6,7 @@ import bs4
 from myparser import get_soup
 from myparser.InfoMovie import InfoMovie, InfoMaker, InfoLabel, InfoDirector, InfoActor, InfoKeyword, InfoSeries
 from myparser.ParserCommon import get_soup_async
-from myparser.movie import find_span_as_pair, select_one_attr
+from myparser.movie import find_span_as_pair, select_one_attr, map_ordered
 from myqt.QtImage import MyImageSource
 
 root = "https://www.javbus.com"
@@ -31,7 +31,7 @@ def get_javbus_series(args) -> list:
         return [data[movie_id], True, MyImageSource(data[movie_id]["cover"], q_pix=False)]
 
     s_url = f"https://www.javbus.com/ja/search/{movie_id}"
-    soup = get_soup(s_url)
+    soup = get_soup(s_url, expect=b"movie-box")
     print(movie_id, threading.current_thread().ident)
     if soup:
         elements = soup.select("a[class=movie-box]")
@@ -45,10 +45,10 @@ def get_javbus_series(args) -> list:
 
 async def async_get_javbus_series(loop, movie_id, data) -> list:
     if movie_id in data:
-        return [data[movie_id], True, MyImageSource(data[movie_id]["cover"], q_pix=False)]
+        return [data[movie_id], True, await MyImageSource.from_url_async(data[movie_id]["cover"])]
 
     s_url = f"https://www.javbus.com/ja/search/{movie_id}"
-    soup = await get_soup_async(loop, s_url)
+    soup = await get_soup_async(loop, s_url, expect=b"movie-box")
 
     if soup:
         elements = soup.select("a[class=movie-box]")
@@ -57,11 +57,11 @@ async def async_get_javbus_series(loop, movie_id, data) -> list:
                 mid, url, title, img = search_single_simple(e)
                 print(mid, title)
                 return [{"mid": str(mid), "title": str(title), "url": str(url), "cover": str(img)},
-                        False, MyImageSource(str(img), q_pix=False)]
+                        False, await MyImageSource.from_url_async(str(img))]
     return []
 
 
-def search_movie(path: str, movie_id: str) -> list[InfoMovie]:
+def search_movie(path: str, movie_id: str, cancel=None) -> list[InfoMovie]:
     if not movie_id:
         return []
 
@@ -74,15 +74,11 @@ def search_movie(path: str, movie_id: str) -> list[InfoMovie]:
     # print(get_html(s_url))
     result = []
 
-    soup = get_soup(s_url)
+    soup = get_soup(s_url, expect=b"movie-box")
     if soup:
         elements = soup.select("a[class=movie-box]")
-        for e in elements:
-            print(e.attrs['href'])
-            # if f"/{movie_id.upper()}" in e.attrs['href']:
-            movie = search_single(path, movie_id, e)
-            if movie:
-                result.append(movie)
+        # if f"/{movie_id.upper()}" in e.attrs['href']:
+        result = map_ordered(lambda e: search_single(path, movie_id, e), elements, cancel=cancel)
 
     return result
 
@@ -114,7 +110,7 @@ def search_single(path, keyword, element: bs4.element.Tag) -> Optional[InfoMovie
     mid, url, title, front = search_single_simple(element)
 
     if mid:
-        soup = get_soup(url)
+        soup = get_soup(url, expect=b"bigImage")
 
         if soup:
             director = InfoDirector.add(*find_span_as_pair(soup, "監督:", p_name))
@@ -1,11 +1,12 @@
-import requests
+import MyHttp
 from requests.cookies import RequestsCookieJar
 
 from myparser import get_soup, get_soup_from_text
 from myparser.InfoMovie import InfoMovie, InfoDirector, InfoSeries, InfoMaker, InfoLabel, InfoKeyword, InfoActor
+from myparser.movie import map_ordered
 
 
-def search_movie(path, keyword) -> list:
+def search_movie(path, keyword, cancel=None) -> list:
     if not keyword:
         return []
 
@@ -15,13 +16,10 @@ def search_movie(path, keyword) -> list:
     print(s_url)
 
     result = []
-    soup = get_soup(s_url)
+    soup = get_soup(s_url, expect=b"myfav_wrap")
     if soup:
         elements = soup.select("div[class=myfav_wrap]")
-        for e in elements:
-            movie = search_single(path, keyword, e)
-            if movie:
-                result.append(movie)
+        result = map_ordered(lambda e: search_single(path, keyword, e), elements, cancel=cancel)
 
     return result
 
@@ -95,7 +93,7 @@ def search_single(path, keyword, element) -> InfoMovie:
     if detail_url:
         jar = RequestsCookieJar()
         jar.set('mgs_agef', '1', domain='.mgstage.com', path='/')
-        r = requests.get(detail_url, cookies=jar)
+        r = MyHttp.get(detail_url, cookies=jar)
         html = r.content
         soup = get_soup_from_text(html)
         back = soup.select_one("a[class='link_magnify']")
@@ -1,22 +1,40 @@
 import asyncio
 import re
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, Future, wait, as_completed
 from multiprocessing import Pool
 from typing import Callable
 
-from PySide6.QtCore import Signal, QThread, QSize
+from PySide6.QtCore import Signal, QThread
 
 from myparser.MovieCache import MovieCacheLite
 from myparser.MovieNameFix import movie_name_fix
 from myparser.movie import SearchType, mgstage, duga, eiten, javbus
 from myparser.movie.fanza import search_movie
 from myparser.movie.javbus import get_javbus_series, async_get_javbus_series
-from myqt.QtImage import MyImageSource
 from myqt.MyQtWorker import MyThread, MyThreadPool
 
 
+class SearchCancel:
+    """Stands in for the QThread given to the parsers, also interrupted once a fan-out search is settled."""
+
+    def __init__(self, thread: QThread):
+        self.thread = thread
+        self.event = threading.Event()
+
+    def set(self) -> None:
+        self.event.set()
+
+    def isInterruptionRequested(self) -> bool:
+        return self.event.is_set() or self.thread.isInterruptionRequested()
+
+
 class MovieParser(object):
     end_count = 0
+    fan_out = False
+    # seconds FANZA may take before the other sources are shown
+    fanza_grace = 1.5
 
     @staticmethod
     def parse(path: str, keyword: str, output: Signal, stype: SearchType = SearchType.ALL, single_mode=False,
@@ -43,6 +61,8 @@ class MovieParser(object):
 
     @staticmethod
     def search_all(path, keyword, output: Signal, thread: QThread, single_mode=False):
+        if MovieParser.fan_out:
+            return MovieParser.search_fan_out(path, keyword, output, thread, single_mode=single_mode)
         print("search_all")
         result = MovieParser.search_fanza(path, keyword, output, thread, single_mode=single_mode)
         if not result:
@@ -57,7 +77,55 @@ class MovieParser(object):
         return result
 
     @staticmethod
-    def search_fanza(path, keyword, output: Signal, thread: QThread, single_mode=False) -> bool:
+    def search_fan_out(path, keyword, output: Signal, thread: QThread, single_mode=False) -> bool:
+        """Query every source at once and show each answer as it arrives.
+
+        FANZA gets ``fanza_grace`` seconds to answer first; if it finds anything
+        the other sources are dropped like in the sequential search. The first
+        source with an exact movie_id hit ends the search.
+        """
+        cancel = SearchCancel(thread)
+        sources = {"fanza": lambda: MovieParser.fanza_results(path, keyword, cancel, single_mode),
+                   "javbus": lambda: javbus.search_movie(path, keyword, cancel),
+                   "eiten": lambda: eiten.search_movie(path, keyword, cancel),
+                   "duga": lambda: duga.search_movie(path, keyword, cancel),
+                   "mgstage": lambda: mgstage.search_movie(path, keyword, cancel)}
+        executor = ThreadPoolExecutor(max_workers=len(sources), thread_name_prefix="search_all")
+        futures = {executor.submit(call): name for name, call in sources.items()}
+        fanza = next(f for f, name in futures.items() if name == "fanza")
+        found = False
+        try:
+            done, _ = wait([fanza], timeout=MovieParser.fanza_grace)
+            if fanza in done:
+                out = MovieParser.source_result(fanza, "fanza")
+                if out:
+                    MovieParser.process_search_result(out, keyword, output, cancel)
+                    return True
+                del futures[fanza]
+            for f in as_completed(futures):
+                if cancel.isInterruptionRequested():
+                    break
+                out = MovieParser.source_result(f, futures[f])
+                if not out:
+                    continue
+                found = True
+                if MovieParser.process_search_result(out, keyword, output, cancel):
+                    break
+        finally:
+            cancel.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+        return found
+
+    @staticmethod
+    def source_result(f: Future, name: str) -> list:
+        try:
+            return f.result()
+        except Exception as e:
+            print(name, e)
+        return []
+
+    @staticmethod
+    def fanza_results(path, keyword, thread, single_mode=False) -> list:
         m = re.compile(r"(^[A-Z]+?)-?(\d+)").match(keyword)
         if m:
             modify_keyword = f"{m.groups()[0]}-{int(m.groups()[1]):05d}"
@@ -65,61 +133,37 @@ class MovieParser(object):
             out.extend(search_movie(path, keyword, thread, single_mode))
         else:
             out = search_movie(path, keyword, thread, single_mode)
+        return out
+
+    @staticmethod
+    def search_fanza(path, keyword, output: Signal, thread: QThread, single_mode=False) -> bool:
+        out = MovieParser.fanza_results(path, keyword, thread, single_mode)
 
         MovieParser.process_search_result(out, keyword, output, thread)
         return len(out) > 0
 
     @staticmethod
     def search(call: Callable, path, keyword, output: Signal, thread: QThread):
-        out = call(path, keyword)
+        out = call(path, keyword, thread)
 
         MovieParser.process_search_result(out, keyword, output, thread)
         return len(out) > 0
 
     @staticmethod
-    def process_search_result(out, keyword, output: Signal, thread: QThread) -> None:
+    def process_search_result(out, keyword, output: Signal, thread: QThread) -> bool:
+        """Emit the exact movie_id hits, or the first results when there are none; True on an exact hit."""
         if thread.isInterruptionRequested():
-            return
+            return False
 
         if len(out):
-            hits = []
-            for m in out:
-                if m.movie_id == keyword:
-                    hits.append(m)
-            if hits:
-                for m in hits:
-                    f = None
-                    b = None
-                    if m.front_img_url:
-                        f = MyImageSource(m.front_img_url, QSize(147, 200), q_pix=False)
-                        if f.data is None:
-                            m.front_img_url = None
-                            f = None
-                    if m.back_img_url:
-                        b = MyImageSource(m.back_img_url, q_pix=False)
-                        if b.data is None:
-                            m.back_img_url = None
-                            b = None
-                    output.emit((m, f, b))
-                    if thread.isInterruptionRequested():
-                        break
-            else:
-                for idx, m in enumerate(out):
-                    f = None
-                    b = None
-                    if m.front_img_url:
-                        f = MyImageSource(m.front_img_url, QSize(147, 200), q_pix=False)
-                        if f.data is None:
-                            m.front_img_url = None
-                            f = None
-                    if m.back_img_url:
-                        b = MyImageSource(m.back_img_url, q_pix=False)
-                        if b.data is None:
-                            m.back_img_url = None
-                            b = None
-                    output.emit((m, f, b))
-                    if idx > 10 or thread.isInterruptionRequested():
-                        break
+            hits = [m for m in out if m.movie_id == keyword]
+            # no images here, MovieWidget loads the cover in the background and the back once it is shown
+            for idx, m in enumerate(hits or out):
+                output.emit((m, None, None))
+                if thread.isInterruptionRequested() or (not hits and idx > 10):
+                    break
+            return len(hits) > 0
+        return False
 
     @staticmethod
     async def async_batch_get_movie_lite(loop, mid_list, thread, out_signal, exist):
@@ -1,10 +1,10 @@
 import os
 import shutil
 import time
-from typing import Tuple, AnyStr
+from typing import Tuple, AnyStr, Callable, Optional
 
-from PySide6.QtCore import Slot
-from PySide6.QtWidgets import QDialog, QLineEdit
+from PySide6.QtCore import Slot, QStringListModel
+from PySide6.QtWidgets import QDialog, QLineEdit, QCompleter
 
 from MyCommon import list_jpg, valid_folder_name, join_path, list_dir
 from TextOut import TextOut
@@ -82,9 +82,15 @@ class ConfirmDialog(QtDialog):
 
 
 class InputDialog(QtDialog):
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, complete: Optional[Callable[[str], list[str]]] = None, **kwargs):
         super().__init__(*args, **kwargs)
         self.txt_input = QLineEdit()
+        self.complete = complete
+        if complete is not None:
+            self.complete_model = QStringListModel()
+            completer = QCompleter(self.complete_model, self)
+            self.txt_input.setCompleter(completer)
+            self.txt_input.textEdited.connect(self.update_complete)
         layout = QtVBox().addAll(self.txt_input,
                                  self._bar_ok_cancel())
         self.setLayout(layout)
@@ -93,6 +99,10 @@ class InputDialog(QtDialog):
     def get_result(self) -> str:
         return self.txt_input.text()
 
+    @Slot(str)
+    def update_complete(self, text: str) -> None:
+        self.complete_model.setStringList(self.complete(text) if text else [])
+
 
 class RenameDialog(QtDialog):
     def __init__(self, path_current: str, path_target: str = "",
@@ -1,16 +1,27 @@
 #!/usr/bin/env python3
+import bisect
+import os
 import sys
-from typing import Optional
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional, Callable
 from PySide6 import QtCore, QtWidgets
-from PySide6.QtCore import Qt, QMargins, QPoint, QRect, QSize, Slot
+from PySide6.QtCore import Qt, QMargins, QPoint, QRect, QSize, Slot, Signal
 from PySide6.QtGui import QPalette
 from PySide6.QtWidgets import *
 from PySide6.QtWidgets import QWidget
 
-from myqt.QtImage import MyImageSource, MyImageBox
+from myqt.QtImage import MyImageSource, MyImageBox, MyImageLoader
+from myqt.QtImageCache import QtImageCache
 
 
 class MyQtFlowLayout(QLayout):
+    """Flow of widgets in rows, a new row starts when the widget type changes.
+
+    The size hints, the position of every item and the row state before it
+    are kept, so adding images only lays out and moves the new ones. Qt
+    calls ``invalidate`` without saying which child changed, the next layout
+    then compares the hints once and restarts from the first one that differs.
+    """
     add_to_front = False
 
     def __init__(self, parent=None):
@@ -20,17 +31,39 @@ class MyQtFlowLayout(QLayout):
             self.setContentsMargins(QMargins(0, 0, 0, 0))
 
         self._item_list = []
+        self._hints: list[Optional[QSize]] = []
+        # (x, y, line_height, last_type) before each item, relative to the rect
+        self._states: list[tuple] = []
+        self._rects: list[QRect] = []
+        self._height = 0
+        self._width = -1
+        # items from this index on have to be laid out again
+        self._dirty = 0
+        self._verify = False
+        self._min_size: Optional[QSize] = None
+        self._spacing: dict = {}
+        self._applied_rect = QRect()
+        self._applied = 0
 
     def __del__(self):
         item = self.takeAt(0)
         while item:
             item = self.takeAt(0)
 
+    def _changed(self, index: int) -> None:
+        self._dirty = min(self._dirty, index)
+        self._applied = min(self._applied, index)
+
     def addItem(self, item: QLayoutItem) -> None:
         if MyQtFlowLayout.add_to_front:
-            self._item_list.insert(0, item)
+            index = 0
         else:
-            self._item_list.append(item)
+            index = len(self._item_list)
+        self._item_list.insert(index, item)
+        self._hints.insert(index, None)
+        self._changed(index)
+        if self._min_size is not None:
+            self._min_size = self._min_size.expandedTo(item.minimumSize())
 
     def count(self) -> int:
         return len(self._item_list)
@@ -42,9 +75,16 @@ class MyQtFlowLayout(QLayout):
 
     def takeAt(self, index: int) -> Optional[QLayoutItem]:
         if 0 <= index < len(self._item_list):
+            self._hints.pop(index)
+            self._changed(index)
+            self._min_size = None
             return self._item_list.pop(index)
         return None
 
+    def invalidate(self) -> None:
+        self._verify = True
+        super().invalidate()
+
     def expandingDirections(self) -> Qt.Orientations:
         return Qt.Orientations(Qt.Orientation(0))
 
@@ -52,69 +92,112 @@ class MyQtFlowLayout(QLayout):
         return True
 
     def heightForWidth(self, width: int) -> int:
-        height = self._do_layout(QRect(0, 0, width, 0), True)
-        return height
+        self._do_layout(width)
+        return self._height
 
     def setGeometry(self, rect) -> None:
         super(MyQtFlowLayout, self).setGeometry(rect)
-        self._do_layout(rect, False)
+        self._do_layout(rect.width())
+        if rect != self._applied_rect:
+            self._applied_rect = QRect(rect)
+            self._applied = 0
+        full_width = rect.right() - rect.x() - 10
+        for i in range(self._applied, len(self._item_list)):
+            item = self._item_list[i]
+            r = self._rects[i].translated(rect.topLeft())
+            if type(item.widget()) is QPushButton:
+                r.setWidth(full_width)
+            item.setGeometry(r)
+        self._applied = len(self._item_list)
 
     def sizeHint(self) -> QSize:
         return self.minimumSize()
 
     def minimumSize(self) -> QSize:
-        size = QSize()
-
-        for item in self._item_list:
-            size = size.expandedTo(item.minimumSize())
-
-        size += QSize(2 * self.contentsMargins().top(),
-                      2 * self.contentsMargins().top())
-        return size
+        self._refresh()
+        if self._min_size is None:
+            size = QSize()
+            for item in self._item_list:
+                size = size.expandedTo(item.minimumSize())
+            self._min_size = size
+
+        return self._min_size + QSize(2 * self.contentsMargins().top(),
+                                      2 * self.contentsMargins().top())
+
+    def _refresh(self) -> None:
+        """Bring the cached size hints up to date."""
+        if self._verify:
+            self._verify = False
+            self._min_size = None
+            for i, item in enumerate(self._item_list):
+                hint = item.sizeHint()
+                if hint != self._hints[i]:
+                    self._hints[i] = hint
+                    self._changed(i)
+        else:
+            for i in range(self._dirty, len(self._item_list)):
+                if self._hints[i] is None:
+                    self._hints[i] = self._item_list[i].sizeHint()
+
+    def _layout_spacing(self, widget: QWidget) -> tuple[int, int]:
+        style = widget.style()
+        spacing = self._spacing.get(style)
+        if spacing is None:
+            spacing = (style.layoutSpacing(QSizePolicy.PushButton, QSizePolicy.PushButton, Qt.Horizontal),
+                       style.layoutSpacing(QSizePolicy.PushButton, QSizePolicy.PushButton, Qt.Vertical))
+            self._spacing[style] = spacing
+        return spacing
+
+    def _do_layout(self, width: int) -> None:
+        self._refresh()
+        if width != self._width:
+            self._width = width
+            self._changed(0)
+        start = self._dirty
+        if start >= len(self._item_list) and len(self._states) == len(self._item_list) + 1:
+            return
+
+        if start:
+            x, y, line_height, last_type = self._states[start]
+        else:
+            x, y, line_height, last_type = 0, 0, 0, None
+        del self._states[start:]
+        del self._rects[start:]
 
-    def _do_layout(self, rect, test_only) -> int:
-        x = rect.x()
-        y = rect.y()
-        line_height = 0
         spacing = self.spacing()
+        right = width - 1
 
-        last_type = None
-        full_width = rect.right() - rect.x() - 10
+        for i in range(start, len(self._item_list)):
+            self._states.append((x, y, line_height, last_type))
+            item = self._item_list[i]
+            hint = self._hints[i]
 
-        for item in self._item_list:
             current_type = type(item.widget())
             new_line: bool = current_type is not last_type
             last_type = current_type
 
-            style = item.widget().style()
-            layout_spacing_x = style.layoutSpacing(QSizePolicy.PushButton,
-                                                   QSizePolicy.PushButton,
-                                                   Qt.Horizontal)
-            layout_spacing_y = style.layoutSpacing(QSizePolicy.PushButton,
-                                                   QSizePolicy.PushButton,
-                                                   Qt.Vertical)
+            layout_spacing_x, layout_spacing_y = self._layout_spacing(item.widget())
 
             # item.widget().setFixedWidth(rect.right() - rect.x())
 
             space_x = spacing + layout_spacing_x
             space_y = spacing + layout_spacing_y
-            next_x = x + item.sizeHint().width() + space_x
-            if (new_line or next_x - space_x > rect.right()) and line_height > 0:
-                x = rect.x()
+            next_x = x + hint.width() + space_x
+            if (new_line or next_x - space_x > right) and line_height > 0:
+                x = 0
                 y = y + line_height + space_y
-                next_x = x + item.sizeHint().width() + space_x
+                next_x = x + hint.width() + space_x
                 line_height = 0
 
-            if not test_only:
-                if current_type is QPushButton:
-                    item.setGeometry(QRect(QPoint(x, y), QSize(full_width, item.sizeHint().height())))
-                else:
-                    item.setGeometry(QRect(QPoint(x, y), item.sizeHint()))
+            self._rects.append(QRect(QPoint(x, y), hint))
 
             x = next_x
-            line_height = max(line_height, item.sizeHint().height())
+            line_height = max(line_height, hint.height())
 
-        return y + line_height - rect.y()
+        # the state after the last item, where an append carries on
+        self._states.append((x, y, line_height, last_type))
+        self._height = y + line_height
+        self._dirty = len(self._item_list)
 
 
 class MyQtFlowWidget(QWidget):
@@ -137,6 +220,213 @@ class MyQtFlowWidget(QWidget):
         self.setLayout(MyQtFlowLayout())
 
 
+class MyQtVirtualFlow(QWidget):
+    """Grid of image paths that only has widgets for the rows near the viewport.
+
+    Lives inside a MyQtScrollableFlow. Every path gets a fixed cell of the
+    thumbnail size, so the rows are computed without decoding anything; on
+    scroll the MyImageBox of rows that left the viewport (plus ``PREFETCH``
+    viewport heights on each side) are reused for the rows that entered it,
+    and their thumbnails are decoded on demand on a thread pool.
+    """
+    image_ready = Signal(int, int, MyImageSource)
+
+    SPACING = 6
+    HEADER_HEIGHT = 32
+    PREFETCH = 1.0
+
+    def __init__(self, scroll: QScrollArea):
+        super().__init__(scroll)
+        self.scroll = scroll
+        self.paths: list[str] = []
+        self.as_size = QSize(140, 200)
+        self.on_click: Optional[Callable] = None
+        self.group_by_date = False
+        self.columns = 0
+        # (y, height, date header or indices of the paths in the row)
+        self.rows: list[tuple[int, int, object]] = []
+        self.row_ends: list[int] = []
+        self.boxes: dict[int, MyImageBox] = {}
+        self.free_boxes: list[MyImageBox] = []
+        self.headers: dict[int, QPushButton] = {}
+        self.free_headers: list[QPushButton] = []
+        self.pending: dict[int, Future] = {}
+        self.generation = 0
+        self.executor = ThreadPoolExecutor(max_workers=MyImageLoader.WORKERS, thread_name_prefix="flow")
+        self.image_ready.connect(self._image_ready, Qt.QueuedConnection)
+        scroll.verticalScrollBar().valueChanged.connect(self.update_visible)
+
+    def set_paths(self, paths: list, as_size: QSize, on_click: Callable = None, group_by_date=False) -> None:
+        self.clear()
+        self.paths = list(paths)
+        self.as_size = as_size
+        self.on_click = on_click
+        self.group_by_date = group_by_date
+        self.relayout()
+
+    def clear(self) -> None:
+        self.generation += 1
+        self._recycle_all()
+        self.paths = []
+        self.rows = []
+        self.row_ends = []
+        self.setMinimumHeight(0)
+
+    def _recycle_all(self) -> None:
+        for i in list(self.boxes):
+            self._recycle_box(i)
+        for r in list(self.headers):
+            self._recycle_header(r)
+
+    def _recycle_box(self, i: int) -> None:
+        box = self.boxes.pop(i)
+        f = self.pending.pop(i, None)
+        if f is not None:
+            f.cancel()
+        try:
+            if box.parent() is not self:
+                # taken away, MyImageDialog deletes the thumb of a deleted file
+                return
+        except RuntimeError:
+            return
+        box.hide()
+        box.clear()
+        box.image_path = None
+        box.ready = False
+        self.free_boxes.append(box)
+
+    def _recycle_header(self, r: int) -> None:
+        header = self.headers.pop(r)
+        header.hide()
+        self.free_headers.append(header)
+
+    def relayout(self) -> None:
+        cell_w = self.as_size.width() + MyQtVirtualFlow.SPACING
+        self.columns = max(1, (self.width() - MyQtVirtualFlow.SPACING) // cell_w)
+        rows = []
+        y = 0
+        group = None
+        row = None
+        for i, path in enumerate(self.paths):
+            if self.group_by_date:
+                date_str = path.split("/")[-1][:7]
+                if date_str != group:
+                    group = date_str
+                    rows.append((y, MyQtVirtualFlow.HEADER_HEIGHT, date_str))
+                    y += MyQtVirtualFlow.HEADER_HEIGHT + MyQtVirtualFlow.SPACING
+                    row = None
+            if row is None or len(row) >= self.columns:
+                row = []
+                rows.append((y, self.as_size.height(), row))
+                y += self.as_size.height() + MyQtVirtualFlow.SPACING
+            row.append(i)
+        self.rows = rows
+        self.row_ends = [r[0] + r[1] for r in rows]
+        # headers are keyed by row, which moved
+        for r in list(self.headers):
+            self._recycle_header(r)
+        self.setMinimumHeight(y)
+        self.update_visible()
+
+    def resizeEvent(self, event) -> None:
+        super().resizeEvent(event)
+        cell_w = self.as_size.width() + MyQtVirtualFlow.SPACING
+        if max(1, (self.width() - MyQtVirtualFlow.SPACING) // cell_w) != self.columns:
+            self.relayout()
+        else:
+            self.update_visible()
+
+    @Slot()
+    def update_visible(self, *_) -> None:
+        if not self.rows:
+            return
+        view_h = self.scroll.viewport().height()
+        margin = int(view_h * MyQtVirtualFlow.PREFETCH)
+        top = self.scroll.verticalScrollBar().value() - margin
+        bottom = self.scroll.verticalScrollBar().value() + view_h + margin
+        first = bisect.bisect_left(self.row_ends, top)
+        last = first
+        while last < len(self.rows) and self.rows[last][0] <= bottom:
+            last += 1
+
+        wanted = set()
+        for r in range(first, last):
+            if isinstance(self.rows[r][2], list):
+                wanted.update(self.rows[r][2])
+        for i in [i for i in self.boxes if i not in wanted]:
+            self._recycle_box(i)
+        for r in [r for r in self.headers if not first <= r < last]:
+            self._recycle_header(r)
+
+        cell_w = self.as_size.width() + MyQtVirtualFlow.SPACING
+        for r in range(first, last):
+            y, height, content = self.rows[r]
+            if isinstance(content, str):
+                header = self.headers.get(r)
+                if header is None:
+                    header = self.free_headers.pop() if self.free_headers else QPushButton(self)
+                    self.headers[r] = header
+                header.setText(content)
+                header.setGeometry(QRect(0, y, self.width() - 10, height))
+                header.show()
+                continue
+            for col, i in enumerate(content):
+                box = self.boxes.get(i)
+                if box is None:
+                    box = self._take_box(i)
+                box.setGeometry(QRect(QPoint(MyQtVirtualFlow.SPACING + col * cell_w, y), self.as_size))
+                box.show()
+
+    def _take_box(self, i: int) -> MyImageBox:
+        if self.free_boxes:
+            box = self.free_boxes.pop()
+        else:
+            box = MyImageBox(self, self.as_size, None)
+            box.on_click(self._clicked)
+        box.setFixedSize(self.as_size)
+        box.image_path = self.paths[i]
+        self.boxes[i] = box
+
+        cached = QtImageCache.get(QtImageCache.key(self.paths[i], self.as_size.height()))
+        if cached is not None:
+            self._fill(box, MyImageSource.from_image(cached, self.paths[i]))
+        elif i not in self.pending:
+            self.pending[i] = self.executor.submit(self._load, self.generation, i, self.paths[i])
+        return box
+
+    def _load(self, generation: int, i: int, path: str) -> None:
+        if generation == self.generation:
+            self.image_ready.emit(generation, i, MyImageSource(path, self.as_size))
+
+    @Slot()
+    def _image_ready(self, generation: int, i: int, img: MyImageSource) -> None:
+        if generation != self.generation:
+            return
+        self.pending.pop(i, None)
+        box = self.boxes.get(i)
+        if box is not None and box.image_path == img.image_path:
+            self._fill(box, img)
+
+    def _fill(self, box: MyImageBox, img: MyImageSource) -> None:
+        pix = img.to_QPixmap()
+        if pix is None or pix.isNull():
+            return
+        if pix.width() > self.as_size.width():
+            pix = pix.scaled(self.as_size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+        box.setPixmap(pix)
+        box.ready = True
+
+    @Slot()
+    def _clicked(self, path: str, box: MyImageBox, auto_confirm: bool) -> None:
+        if self.on_click:
+            self.on_click(path, box, auto_confirm)
+        # MyImageDialog may have deleted or swapped files, reload what is shown
+        if path in self.paths and not os.path.exists(path):
+            self.paths.remove(path)
+        self._recycle_all()
+        self.relayout()
+
+
 class MyQtScrollableFlow(QScrollArea):
     def __init__(self, flow_widget=None, parent=None, group_by_date=False):
         super().__init__(parent)
@@ -145,16 +435,24 @@ class MyQtScrollableFlow(QScrollArea):
         self.flow = flow_widget
         if not self.flow:
             self.flow = MyQtFlowWidget(self)
+        self.grid: Optional[MyQtVirtualFlow] = None
         self.setBackgroundRole(QPalette.Dark)
         self.setWidget(self.flow)
         self.setWidgetResizable(True)
         self.can_remove = True
 
+    def _use(self, widget: QWidget) -> None:
+        if self.widget() is not widget:
+            # keep the other one, setWidget would delete it
+            self.takeWidget()
+            self.setWidget(widget)
+
     @Slot()
     def change_can_remove(self, val: bool) -> None:
         self.can_remove = val
 
     def addWidget(self, item: QWidget, front=False) -> None:
+        self._use(self.flow)
         MyQtFlowLayout.add_to_front = front
         self.flow.addWidget(item)
         if hasattr(item, 'can_remove'):
@@ -164,8 +462,12 @@ class MyQtScrollableFlow(QScrollArea):
         if self.can_remove:
             self.date_str = ""
             self.flow.clearAll()
+            if self.grid is not None:
+                self.grid.clear()
+            self._use(self.flow)
 
     def show_img(self, as_size, img: MyImageSource, on_click):
+        self._use(self.flow)
         if self.group_by_date:
             date_str = img.image_path.split("/")[-1][:7]
             if not date_str == self.date_str:
@@ -176,6 +478,18 @@ class MyQtScrollableFlow(QScrollArea):
         label = MyImageBox(self, as_size, img).display(self)
         label.on_click(on_click)
 
+    def show_paths(self, paths: list, as_size: QSize, on_click) -> None:
+        """Show a whole folder at once, thumbnails are only decoded when scrolled near."""
+        if self.grid is None:
+            self.grid = MyQtVirtualFlow(self)
+        self._use(self.grid)
+        self.verticalScrollBar().setValue(0)
+        self.grid.set_paths(paths, as_size, on_click, self.group_by_date)
+
+    def resizeEvent(self, event) -> None:
+        super().resizeEvent(event)
+        if self.grid is not None and self.widget() is self.grid:
+            self.grid.update_visible()
 
 if __name__ == '__main__':
     print("Program Start")
@@ -12,6 +12,8 @@ from typing import Callable, Any, Optional
 from PySide6 import QtCore
 from PySide6.QtCore import Slot, Signal, QObject, QThread, QRunnable, QThreadPool, Qt, QCoreApplication, QEvent
 
+import MyHttp
+
 
 def random_name(n):
     return ''.join(random.choices(string.ascii_letters + string.digits, k=n))
@@ -147,6 +149,7 @@ class MyThreadPool:
         asyncio.set_event_loop(loop)
         param.insert(0, loop)
         result = loop.run_until_complete(func_to_run(*param))
+        loop.run_until_complete(MyHttp.async_close())
         loop.stop()
         loop.close()
         return result
@@ -0,0 +1,47 @@
+import os
+
+from PySide6.QtCore import QStandardPaths
+
+import MyThrottle
+from TextOut import TextOut
+from myparser.PageCache import PageCache
+from myqt.QtImageCache import QtImageCache
+from myqt.QtThumbCache import QtThumbCache
+
+CACHE_ROOT = os.path.join(QStandardPaths.writableLocation(QStandardPaths.GenericCacheLocation),
+                          "soft.jp", "Manager")
+
+
+def cache_defaults(settings) -> None:
+    """Add the http/* and image/*cache* keys every app shares to a new settings file."""
+    defaults = {
+        "http/rate": MyThrottle.RATE,
+        "http/burst": MyThrottle.BURST,
+        "http/in_flight": MyThrottle.IN_FLIGHT,
+        "http/cache": "1",
+        "http/cache_ttl": PageCache.ttl,
+        "http/cache_mb": PageCache.store.max_bytes >> 20,
+        "http/cache_hosts": "",
+        "http/cache_dir": os.path.join(CACHE_ROOT, "html"),
+        "image/thumb_cache": "1",
+        "image/thumb_cache_dir": os.path.join(CACHE_ROOT, "thumb"),
+        "image/thumb_cache_mb": QtThumbCache.store.max_bytes >> 20,
+        "image/mem_cache": "1",
+        "image/mem_cache_mb": QtImageCache.max_bytes >> 20,
+    }
+    for key, value in defaults.items():
+        if not settings.contains(key):
+            settings.setValue(key, value)
+
+
+def configure_caches(settings) -> None:
+    MyThrottle.configure_from(settings)
+    PageCache.configure_from(settings)
+    QtThumbCache.configure_from(settings)
+    QtImageCache.configure_from(settings)
+
+
+def log_cache_stats() -> None:
+    TextOut.out(f"page cache {PageCache.stats()}")
+    TextOut.out(f"thumb cache {QtThumbCache.stats()}")
+    TextOut.out(f"image cache {QtImageCache.stats()}")
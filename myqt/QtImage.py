@@ -1,8 +1,10 @@
 import base64
 import os
 import shutil
-from typing import Optional, AnyStr, Union
-from urllib import request
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, AnyStr, Union, Callable, Iterator
 
 import PySide6.QtGui
 from PySide6 import QtCore
@@ -10,9 +12,12 @@ from PySide6.QtCore import Signal, QSize, Qt, Slot
 from PySide6.QtGui import QImageReader, QPixmap, QPalette, QImage
 from PySide6.QtWidgets import QLabel, QSizePolicy, QScrollArea, QMessageBox
 
+import MyHttp
 from MyCommon import copy_file, next_image_path
 from myqt.MyQtCommon import MyButton, QtHBox, QtVBox, fa_icon, QtDialogAutoClose
 from myqt.MyQtWorker import MyThreadPool
+from myqt.QtImageCache import QtImageCache
+from myqt.QtThumbCache import QtThumbCache
 
 
 class MyImageSource:
@@ -35,6 +40,19 @@ class MyImageSource:
         img.pixmap = pixmap
         return img
 
+    @classmethod
+    async def from_url_async(cls, url: AnyStr):
+        img = cls("")
+        img.image_path = url
+        try:
+            headers = None
+            if "javbus.com" in url:
+                headers = {'Referer': 'https://www.javbus.com/'}
+            img.data = await MyHttp.async_get(url, headers=headers)
+        except Exception as ex:
+            print("from_url_async", ex)
+        return img
+
     def __init__(self, path: AnyStr, size: QSize = None, height: int = 0, q_pix=True, async_out: Signal = None):
         if not height and size:
             height = size.height()
@@ -62,33 +80,42 @@ class MyImageSource:
                                        self.load, path, size, height, q_pix)
 
     def load(self, path, size, height, q_pix) -> None:
-        if path.startswith("http"):
-            self.image_load_url(path, q_pix, height)
-        else:
-            if size is None and not height:
-                self.image_load_file(path)
+        # raw bytes are wanted as they are, for saving
+        cache_key = QtImageCache.key(path, height) if q_pix else None
+        self.image = QtImageCache.get(cache_key)
+        if self.image is None:
+            if path.startswith("http"):
+                self.image_load_url(path, q_pix, height)
             else:
-                self.image = self.image_load(path, height)
+                if size is None and not height:
+                    self.image_load_file(path)
+                else:
+                    key = QtThumbCache.key(path, height)
+                    self.image = QtThumbCache.load(key)
+                    if self.image is None:
+                        self.image = self.image_load(path, height)
+                        QtThumbCache.save(key, self.image)
+            QtImageCache.put(cache_key, self.image)
         if self.async_out:
             self.async_out.emit(self)
 
     def image_load_url(self, url: AnyStr, q_pix: bool, height: int = 0) -> None:
         try:
-            req = request.Request(url)
-            req.add_header('User-Agent', 'Mozilla/5.0')
+            headers = None
             if "javbus.com" in url:
-                req.add_header('Referer', 'https://www.javbus.com/')
-            with request.urlopen(req) as img:
-                if q_pix:
-                    self.pixmap = QPixmap()
-                    self.pixmap.loadFromData(img.read())
-                    if 0 < height < self.pixmap.height():
-                        self.pixmap = self.pixmap.scaledToHeight(height)
-                else:
-                    self.data = img.read()
+                headers = {'Referer': 'https://www.javbus.com/'}
+            # covers shared by several widgets or parsers are only downloaded once
+            data = MyHttp.get_content(url, headers=headers)
+            if q_pix:
+                # a QImage, QPixmap is not safe off the gui thread and this one is cached
+                self.image = QImage.fromData(data)
+                if 0 < height < self.image.height():
+                    self.image = self.image.scaledToHeight(height)
+            else:
+                self.data = data
         except Exception as ex:
             self.data = None
-            self.pixmap = None
+            self.image = None
             print("image_load_url", ex)
 
     def image_load_file(self, path: AnyStr) -> None:
@@ -153,6 +180,65 @@ class MyImageSource:
         return None
 
 
+class MyImageLoader:
+    """Decode thumbnails of a page on a thread pool and hand them out in display order.
+
+    ``load`` is a generator for the worker that feeds the gallery signal. It
+    keeps ``workers * 2`` decodes in flight and waits while ``backlog`` images
+    are emitted but not yet shown, the slot showing them calls ``shown``.
+    Once ``check_cancel`` is true the generator just ends, callers check it
+    again after the loop.
+    """
+    WORKERS = min(8, os.cpu_count() or 1)
+    BACKLOG = 32
+    POLL = 0.1
+
+    def __init__(self, workers: int = WORKERS, backlog: int = BACKLOG):
+        self.workers = max(1, workers)
+        self.backlog = max(1, backlog)
+        self.queued = 0
+        self.cond = threading.Condition()
+
+    def shown(self) -> None:
+        with self.cond:
+            # images emitted by others reach the same slot
+            if self.queued > 0:
+                self.queued -= 1
+                self.cond.notify()
+
+    def _wait_slot(self, check_cancel: Optional[Callable[[], bool]]) -> bool:
+        with self.cond:
+            while self.queued >= self.backlog:
+                if check_cancel and check_cancel():
+                    return False
+                self.cond.wait(MyImageLoader.POLL)
+            self.queued += 1
+            return True
+
+    def load(self, files: list, size: QSize,
+             check_cancel: Optional[Callable[[], bool]] = None) -> Iterator[tuple[str, MyImageSource]]:
+        files = iter(files)
+        pending = deque()
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="thumb") as executor:
+            try:
+                for file in files:
+                    pending.append((file, executor.submit(MyImageSource, file, size)))
+                    if len(pending) >= self.workers * 2:
+                        break
+                while pending:
+                    file, future = pending.popleft()
+                    img = future.result()
+                    for nxt in files:
+                        pending.append((nxt, executor.submit(MyImageSource, nxt, size)))
+                        break
+                    if not self._wait_slot(check_cancel):
+                        return
+                    yield file, img
+            finally:
+                for _, future in pending:
+                    future.cancel()
+
+
 class MyImageBox(QLabel):
     on_image = Signal(MyImageSource)
     clicked = Signal(str, QLabel, bool)
@@ -0,0 +1,95 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import AnyStr, Optional
+
+from PySide6.QtGui import QImage
+
+
+class QtImageCache:
+    """Decoded images shared by every MyImageSource of the process.
+
+    Keyed by (path or url, target height). A local path also carries its
+    mtime and size, so a file replaced on disk (a new folder.jpg) misses
+    instead of showing the old picture. The least recently used images are
+    dropped once the decoded pixels are over ``max_bytes``. QImage is
+    implicitly shared, a hit hands out the same pixels without a copy.
+    """
+    enabled = True
+    max_bytes = 256 * 1024 * 1024
+
+    images: OrderedDict[tuple, QImage] = OrderedDict()
+    total = 0
+    counters = {"hit": 0, "miss": 0, "evict": 0}
+    lock = threading.Lock()
+
+    @staticmethod
+    def key(path: AnyStr, height: int = 0) -> Optional[tuple]:
+        if not path or path.startswith("data:"):
+            return None
+        if path.startswith("http"):
+            return path, height
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return os.path.abspath(path), height, st.st_mtime_ns, st.st_size
+
+    @staticmethod
+    def get(key: Optional[tuple]) -> Optional[QImage]:
+        if not QtImageCache.enabled or key is None:
+            return None
+        with QtImageCache.lock:
+            image = QtImageCache.images.get(key)
+            if image is None:
+                QtImageCache.counters["miss"] += 1
+                return None
+            QtImageCache.images.move_to_end(key)
+            QtImageCache.counters["hit"] += 1
+            return image
+
+    @staticmethod
+    def put(key: Optional[tuple], image: Optional[QImage]) -> None:
+        if not QtImageCache.enabled or key is None or image is None or image.isNull():
+            return
+        size = image.sizeInBytes()
+        # one huge scan would flush everything else
+        if size > QtImageCache.max_bytes // 4:
+            return
+        with QtImageCache.lock:
+            old = QtImageCache.images.pop(key, None)
+            if old is not None:
+                QtImageCache.total -= old.sizeInBytes()
+            QtImageCache.images[key] = image
+            QtImageCache.total += size
+            QtImageCache._evict()
+
+    @staticmethod
+    def _evict() -> None:
+        while QtImageCache.total > QtImageCache.max_bytes and QtImageCache.images:
+            _, image = QtImageCache.images.popitem(last=False)
+            QtImageCache.total -= image.sizeInBytes()
+            QtImageCache.counters["evict"] += 1
+
+    @staticmethod
+    def clear() -> None:
+        with QtImageCache.lock:
+            QtImageCache.images.clear()
+            QtImageCache.total = 0
+
+    @staticmethod
+    def stats() -> dict:
+        with QtImageCache.lock:
+            s = dict(QtImageCache.counters)
+            s["entries"] = len(QtImageCache.images)
+            s["bytes"] = QtImageCache.total
+        return s
+
+    @staticmethod
+    def configure_from(settings) -> None:
+        QtImageCache.enabled = settings.valueInt("image/mem_cache", 1) == 1
+        with QtImageCache.lock:
+            QtImageCache.max_bytes = settings.valueInt("image/mem_cache_mb", QtImageCache.max_bytes >> 20) << 20
+            QtImageCache._evict()
+        if not QtImageCache.enabled:
+            QtImageCache.clear()
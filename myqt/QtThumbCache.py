@@ -0,0 +1,98 @@
+import hashlib
+import os
+import threading
+from typing import AnyStr, Optional
+
+from PySide6.QtCore import QStandardPaths
+from PySide6.QtGui import QImage
+
+from MyCommon import DiskLru
+
+
+class QtThumbCache:
+    """Scaled copies of local images, so reopening a folder does not decode every full size jpg again.
+
+    A thumbnail is stored as ``<sha1>.jpg`` where the hash covers the absolute
+    path, mtime, file size and target height, so an edited or replaced file
+    simply misses. Sources smaller than ``MIN_SOURCE`` bytes are not cached,
+    reading them is as cheap as reading a thumbnail, and neither are images
+    with an alpha channel.
+    """
+    DIR = os.path.join(QStandardPaths.writableLocation(QStandardPaths.GenericCacheLocation),
+                       "soft.jp", "Manager", "thumb")
+    SUFFIX = ".jpg"
+    QUALITY = 85
+    MIN_SOURCE = 64 * 1024
+
+    enabled = True
+    store = DiskLru(DIR, SUFFIX, 512 * 1024 * 1024)
+    counters = {"hit": 0, "miss": 0}
+    lock = threading.Lock()
+
+    @staticmethod
+    def key(path: AnyStr, height: int) -> Optional[str]:
+        if height <= 0:
+            return None
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        if st.st_size < QtThumbCache.MIN_SOURCE:
+            return None
+        raw = f"{os.path.abspath(path)}|{st.st_mtime_ns}|{st.st_size}|{height}"
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def load(key: Optional[str]) -> Optional[QImage]:
+        if not QtThumbCache.enabled or key is None:
+            return None
+        if key in QtThumbCache.store:
+            image = QImage(QtThumbCache.store.path(key))
+            if not image.isNull():
+                QtThumbCache.store.touch(key)
+                with QtThumbCache.lock:
+                    QtThumbCache.counters["hit"] += 1
+                return image
+            QtThumbCache.store.drop(key)
+        with QtThumbCache.lock:
+            QtThumbCache.counters["miss"] += 1
+        return None
+
+    @staticmethod
+    def save(key: Optional[str], image: Optional[QImage]) -> None:
+        if not QtThumbCache.enabled or key is None or image is None or image.isNull():
+            return
+        if image.hasAlphaChannel():
+            # jpg would flatten it
+            return
+        path = QtThumbCache.store.path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(QtThumbCache.store.folder, exist_ok=True)
+            if not image.save(tmp_path, "JPG", QtThumbCache.QUALITY):
+                return
+            os.replace(tmp_path, path)
+            QtThumbCache.store.add(key, os.path.getsize(path))
+        except Exception as e:
+            print(e)
+        finally:
+            if os.path.exists(tmp_path):
+                try:
+                    os.remove(tmp_path)
+                except OSError as e:
+                    print(e)
+
+    @staticmethod
+    def stats() -> dict:
+        with QtThumbCache.lock:
+            s = dict(QtThumbCache.counters)
+        s["evict"] = QtThumbCache.store.evicted
+        s["entries"] = len(QtThumbCache.store)
+        s["bytes"] = QtThumbCache.store.total
+        return s
+
+    @staticmethod
+    def configure_from(settings) -> None:
+        QtThumbCache.enabled = settings.valueInt("image/thumb_cache", 1) == 1
+        QtThumbCache.store.set_folder(settings.valueStr("image/thumb_cache_dir", QtThumbCache.DIR) or QtThumbCache.DIR)
+        QtThumbCache.store.max_bytes = settings.valueInt("image/thumb_cache_mb", QtThumbCache.store.max_bytes >> 20) << 20
@@ -2,11 +2,10 @@ import datetime
 import os
 import subprocess
 import threading
-import time
 from typing import Optional, AnyStr, Union
 
 from PySide6 import QtMultimedia, QtCore
-from PySide6.QtCore import Signal, QSize, Qt, Slot, QThread, QCoreApplication, QObject
+from PySide6.QtCore import Signal, QSize, Qt, Slot, QThread, QObject
 from PySide6.QtMultimedia import QMediaPlayer, QAudioOutput, QMediaMetaData, QMediaFormat, QVideoSink, QVideoFrame
 from PySide6.QtMultimediaWidgets import QVideoWidget
 from PySide6.QtWidgets import QSlider, QLabel, QProgressBar
@@ -15,7 +14,7 @@ from MyCommon import join_path, list_dir, save_json, find_main_widget
 from myqt.MyQtCommon import fa_icon, MyButton, QtHBox, QtVBox, QtDialogAutoClose
 from myqt.MyQtFlow import MyQtScrollableFlow
 from myqt.MyQtWorker import MyThread
-from myqt.QtImage import MyImageSource, MyImageBox
+from myqt.QtImage import MyImageSource, MyImageBox, MyImageLoader
 
 
 class QtVideoDialog(QtDialogAutoClose):
@@ -200,6 +199,7 @@ class MyVideoDialog(QtVideoDialog):
         self.but_stop.setEnabled(False)
 
         self.image_flow = MyQtScrollableFlow()
+        self.thumb_loader = MyImageLoader()
         self.image_flow.setMinimumWidth(180)
         self.image_flow.setMaximumWidth(180)
         self.image_flow.setContentsMargins(20, 5, 0, 5)
@@ -290,22 +290,21 @@ class MyVideoDialog(QtVideoDialog):
     def async_load_preview_images(self, folder, as_size, thread):
         files = list_dir(folder, f"{self.current_track + self.track_offset}*.jpg")
 
-        for f in files:
-            file: str = f.replace("\\", "/")
-            img = MyImageSource(file, as_size)
+        files = [f.replace("\\", "/") for f in files]
+        for file, img in self.thumb_loader.load(files, as_size,
+                                                lambda: not self.image_signal or QThread.isInterruptionRequested(thread)):
             if self.image_signal:
                 self.image_signal.emit(file, as_size, img)
             else:
                 break
             if QThread.isInterruptionRequested(thread):
                 break
-            time.sleep(0.01)
         return True
 
     @Slot()
     def show_image(self, _, as_size, img: MyImageSource) -> None:
         self.image_flow.show_img(as_size, img, self.seek_by_image)
-        QCoreApplication.processEvents()
+        self.thumb_loader.shown()
 
     @Slot()
     def seek_by_image(self, path: str, _1, _2):